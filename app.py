@@ -1,19 +1,24 @@
 import streamlit as st
+import streamlit.components.v1 as components
+import graphviz
+import hashlib
 import io
-import base64
 import json
 import zipfile
 import os
-import tempfile
 import re
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+from functools import partial
 
-from utils.parser import get_parser, ManualInputParser
-from utils.uml_generator import UMLGenerator
+from utils.parser import get_parser, JavaParser, PythonParser, JavaScriptParser, ManualInputParser
+from utils.uml_generator import UMLGenerator, pipe_cached
 from utils.data_models import ClassDefinition, Attribute, Method, Relationship, UMLDiagram
 from utils.test_uml import generate_test_uml
-from utils.code_analyzer import CodeAnalyzer
+from utils.code_analyzer import CodeAnalyzer, analyze_files
+from utils.demographic_analyzer import analyze_demographic_data, iter_code_files
+from utils.parallel import thread_map
 
 # Set page title and configure layout
 st.set_page_config(
@@ -23,8 +28,57 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize the generator
+# Initialize the generator and the code analyzer
 generator = UMLGenerator()
+analyzer = CodeAnalyzer()
+
+# Selectbox options for the editors, with option -> index maps for the default selection
+VISIBILITY_OPTIONS = ["+", "-", "#"]
+VISIBILITY_INDEX = {vis: i for i, vis in enumerate(VISIBILITY_OPTIONS)}
+RELATIONSHIP_TYPES = ["inheritance", "implementation", "association", "dependency", "aggregation", "composition"]
+RELATIONSHIP_TYPE_INDEX = {rel_type: i for i, rel_type in enumerate(RELATIONSHIP_TYPES)}
+
+# Height in pixels of the scrollable frame the diagrams are rendered in
+DIAGRAM_HEIGHT = 700
+
+# One stylesheet for every download button, in the app's green button style
+DOWNLOAD_BUTTON_CSS = """
+<style>
+.stDownloadButton button {
+    padding: 0.5em 1em;
+    background-color: #4CAF50;
+    color: white;
+    border: none;
+    border-radius: 4px;
+    cursor: pointer;
+}
+</style>
+"""
+
+# Patterns for the Data Analysis file summaries, compiled once
+CLASS_PATTERN = re.compile(r'class\s+\w+')
+INTERFACE_PATTERN = re.compile(r'interface\s+\w+')
+METHOD_PATTERN = re.compile(r'(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\([^)]*\)')
+CONTROLLER_PATTERN = re.compile(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Controller|Resource|RestController|Handler)', re.IGNORECASE)
+DATA_ACCESS_PATTERN = re.compile(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Repository|DAO)', re.IGNORECASE)
+SERVICE_PATTERN = re.compile(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Service|Manager)', re.IGNORECASE)
+ENTITY_PATTERN = re.compile(r'@Entity|@Table', re.IGNORECASE)
+EXCEPTION_PATTERN = re.compile(r'class\s+.*?(?:Exception|Error)\s*\{', re.IGNORECASE)
+INTERFACE_PURPOSE_PATTERN = re.compile(r'interface\s+\w+', re.IGNORECASE)
+ENUM_PATTERN = re.compile(r'enum\s+\w+', re.IGNORECASE)
+
+# A drive letter at the start of a ZIP entry name, e.g. "C:"
+ZIP_DRIVE_PATTERN = re.compile(r'[A-Za-z]:')
+
+# File purposes recognized by pattern, in priority order
+PURPOSE_RULES = [
+    (CONTROLLER_PATTERN, "Controller/API"),
+    (DATA_ACCESS_PATTERN, "Data Access"),
+    (SERVICE_PATTERN, "Service"),
+    (ENTITY_PATTERN, "Entity/Model"),
+    (EXCEPTION_PATTERN, "Exception"),
+    (INTERFACE_PURPOSE_PATTERN, "Interface"),
+]
 
 
 def display_help():
@@ -88,117 +142,501 @@ def display_help():
     """)
 
 
-def get_download_link(diagram: UMLDiagram, file_format: str, diagram_type: str = "class", selected_package: Optional[str] = None):
-    """Generate a download link for the diagram
+@st.cache_resource(show_spinner=False)
+def cached_parser(language: str):
+    """Parser for a language, created once per process; the parsers hold no state"""
+    return get_parser(language)
+
+
+@st.cache_data(show_spinner=False)
+def parse_code(code_hash: str, _code: str, language: str) -> UMLDiagram:
+    """Parse extracted code into a UML diagram
     
-    Args:
-        diagram: UML diagram data
-        file_format: 'svg' or 'png'
-        diagram_type: 'class' or 'package'
-        selected_package: Optional package name to filter by
+    Cached on the code's content digest and the language so that reruns which don't
+    change the upload (widget interactions, editor add/delete clicks) skip the parse
+    entirely, without Streamlit hashing the whole code on every call.
+    Code combined from several files is parsed file by file.
     """
+    parser = cached_parser(language)
+    if parser is None:
+        raise ValueError(f"Parser for {language} not available.")
+    if isinstance(parser, (JavaParser, PythonParser, JavaScriptParser)):
+        files = list(iter_code_files(_code))
+        if files:
+            return parser.parse_files(files)
+    return parser.parse(_code)
+
+
+def split_code_files(code: str) -> List[Dict[str, str]]:
+    """Split the combined code into a list of files with their path and content"""
+    java_files = []
+    code_chunks = code.split("# File: ")
+    
+    # Skip the first empty chunk
+    for chunk in code_chunks[1:]:
+        lines = chunk.strip().split("\n", 1)
+        if len(lines) >= 2:
+            file_path = lines[0].strip()
+            content = lines[1]
+            java_files.append({
+                "file_path": file_path,
+                "content": content
+            })
+    
+    return java_files
+
+
+def get_java_files() -> List[Dict[str, str]]:
+    """The uploaded code split into files, kept in session state until the upload changes"""
+    if st.session_state.get("java_files_key") != st.session_state.code_hash:
+        st.session_state.java_files = split_code_files(st.session_state.uploaded_code)
+        st.session_state.java_files_key = st.session_state.code_hash
+    return st.session_state.java_files
+
+
+def count_matches(pattern: re.Pattern, text: str) -> int:
+    """Count a pattern's matches without building the list findall returns"""
+    return sum(1 for _ in pattern.finditer(text))
+
+
+def classify_java_files(code: str) -> List[Dict]:
+    """Classify each file of the combined code by its primary purpose
+    
+    Returns a list with the path, purpose and class, interface and method counts of
+    every file, in upload order
+    """
+    file_classes = []
+    
+    for file_info in split_code_files(code):
+        file_path = file_info["file_path"]
+        content = file_info["content"]
+        
+        # Count classes, methods and attributes
+        class_count = count_matches(CLASS_PATTERN, content)
+        interface_count = count_matches(INTERFACE_PATTERN, content)
+        method_count = count_matches(METHOD_PATTERN, content)
+        
+        # Determine primary purpose: the first matching rule wins, then the count-based fallbacks
+        purpose = next((label for pattern, label in PURPOSE_RULES if pattern.search(content)), None)
+        if purpose is None:
+            if class_count > 0 and method_count == 0:
+                purpose = "Data Class"
+            elif ENUM_PATTERN.search(content):
+                purpose = "Enumeration"
+            elif class_count > 0:
+                purpose = "Business Logic"
+            else:
+                purpose = "Unknown"
+        
+        file_classes.append({
+            "file_path": file_path,
+            "purpose": purpose,
+            "class_count": class_count,
+            "interface_count": interface_count,
+            "method_count": method_count
+        })
+    
+    return file_classes
+
+
+def build_demographic_index(demographic_data: Dict) -> Dict[str, Tuple[str, str]]:
+    """Map each file with demographic data to its joined field names and its joined 'field (keyword)' details"""
+    return {
+        file_path: (
+            ", ".join(item["field"] for item in occurrences),
+            ", ".join(f"{item['field']} ({item['keyword']})" for item in occurrences)
+        )
+        for file_path, occurrences in demographic_data.items()
+    }
+
+
+def iter_demographic_file_summaries(file_classes: List[Dict], demographic_index: Dict[str, Tuple[str, str]]):
+    """Yield a (file, file type, summary, fields, field details) row for each classified file with demographic data"""
+    for file_info in file_classes:
+        file_path = file_info["file_path"]
+        
+        # Only include files with demographic data
+        if file_path not in demographic_index:
+            continue
+        purpose = file_info["purpose"]
+        demographic_fields, field_details = demographic_index[file_path]
+        
+        # Add summary
+        summary_text = f"This {purpose.lower()} file contains demographic data fields: {demographic_fields}"
+        
+        yield file_path, purpose, summary_text, demographic_fields, field_details
+
+
+def iter_code_smell_rows(all_files_analysis: Dict[str, Dict]):
+    """Yield a (file, type, element, details, description) row for each code smell found"""
+    for file_path, result in all_files_analysis.items():
+        for smell_type, smells in result["code_smells"].items():
+            smell_label = smell_type.replace("_", " ").title()
+            for smell in smells:
+                if "name" in smell:  # Long methods and Too many parameters
+                    details = f"{smell.get('lines', smell.get('parameter_count', ''))} (Threshold: {smell.get('threshold', '')})"
+                    yield file_path, smell_label, smell.get("name", ""), details, smell["description"]
+                else:  # Other code smells
+                    yield file_path, smell_label, smell.get("match", ""), "", smell["description"]
+
+
+def analysis_issue_table(all_files_analysis: Dict[str, Dict], category: str, columns: List[str]) -> pd.DataFrame:
+    """Table with a (file, type, matched code, description) row for each finding of an analysis category"""
+    return arrow_backed(pd.DataFrame.from_records(
+        ((file_path, issue_type.replace("_", " ").title(), issue.get("match", ""), issue["description"])
+         for file_path, result in all_files_analysis.items()
+         for issue_type, issues in result[category].items()
+         for issue in issues),
+        columns=columns
+    ))
+
+
+def arrow_backed(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a table to PyArrow-backed columns, which store string-heavy tables far more compactly"""
+    return df.convert_dtypes(dtype_backend="pyarrow")
+
+
+def content_digest(text: str) -> str:
+    """Short BLAKE2b hex digest of a string, used as a cache key"""
+    return hashlib.blake2b(text.encode('utf-8', errors='ignore'), digest_size=16).hexdigest()
+
+
+def set_uml_diagram(uml_diagram: UMLDiagram):
+    """Store the current diagram in session state along with its content key"""
+    st.session_state.uml_diagram = uml_diagram
+    st.session_state.uml_key = content_digest(uml_diagram.model_dump_json())
+
+
+# The cached helpers below are keyed on a content digest; the underscore-prefixed
+# arguments carry the data itself and are not hashed by Streamlit.
+
+@st.cache_data(show_spinner=False)
+def cached_demographic_data(code_hash: str, _code: str) -> Dict:
+    """Demographic analysis of the uploaded code, cached per upload"""
+    return analyze_demographic_data(_code)
+
+
+@st.cache_data(show_spinner=False)
+def cached_demographic_table(code_hash: str, _demographic_data: Dict) -> pd.DataFrame:
+    """All demographic fields of the upload as one table, built from row tuples and cached per upload"""
+    return arrow_backed(pd.DataFrame.from_records(
+        ((file, occurrence["field"], occurrence["keyword"], occurrence["count"])
+         for file, occurrences in _demographic_data.items() for occurrence in occurrences),
+        columns=["File", "Field", "Type", "Occurrences"]
+    ))
+
+
+@st.cache_data(show_spinner=False)
+def cached_file_classification(code_hash: str, _code: str) -> List[Dict]:
+    """Purpose and class/interface/method counts of every uploaded file, cached per upload"""
+    return classify_java_files(_code)
+
+
+@st.cache_data(show_spinner=False)
+def cached_hierarchy_table(uml_key: str, _uml_diagram: UMLDiagram) -> pd.DataFrame:
+    """Hierarchy table of the diagram, cached per diagram"""
+    return generate_hierarchy_table(_uml_diagram)
+
+
+@st.cache_data(show_spinner=False)
+def cached_hierarchy_search_keys(uml_key: str, _hierarchy_df: pd.DataFrame) -> pd.Series:
+    """Lowercased source and target class names of each hierarchy row, for the table search"""
+    return _hierarchy_df["Source Class"].str.lower() + "\n" + _hierarchy_df["Target Class"].str.lower()
+
+
+@st.cache_data(show_spinner=False)
+def cached_hierarchy_csv(uml_key: str, _hierarchy_df: pd.DataFrame) -> bytes:
+    """Hierarchy table as CSV bytes, cached per diagram"""
+    return _hierarchy_df.to_csv(index=False).encode()
+
+
+@st.cache_data(show_spinner=False)
+def cached_relationship_counts(uml_key: str, _hierarchy_df: pd.DataFrame) -> pd.DataFrame:
+    """Number of relationships of each type in the hierarchy table, cached per diagram"""
+    relationship_counts = _hierarchy_df["Relationship Type"].value_counts().reset_index()
+    relationship_counts.columns = ["Relationship Type", "Count"]
+    return relationship_counts
+
+
+@st.cache_data(show_spinner=False)
+def cached_package_counts(uml_key: str, _uml_diagram: UMLDiagram) -> pd.DataFrame:
+    """Number of classes in each package, cached per diagram"""
+    packages = Counter(cls.package or "Default" for cls in _uml_diagram.classes)
+    package_data = [{"Package": pkg, "Number of Classes": count} for pkg, count in packages.items()]
+    return pd.DataFrame(package_data)
+
+
+@st.cache_data(show_spinner=False)
+def cached_package_options(uml_key: str, _uml_diagram: UMLDiagram) -> List[str]:
+    """Package filter options of the diagram, cached per diagram"""
+    return ["All Packages"] + sorted({cls.package for cls in _uml_diagram.classes if cls.package})
+
+
+# A resource cache so the SVG and PNG renders of a view share one graph instead of each
+# building the DOT source; the renders never modify it
+@st.cache_resource(show_spinner=False, max_entries=16)
+def cached_class_graph(uml_key: str, _uml_diagram: UMLDiagram, selected_package: Optional[str] = None) -> graphviz.Digraph:
+    """Class diagram graph, cached per diagram and package filter"""
+    if selected_package:
+        # Hand the generator only the package's classes instead of letting it filter them all
+        package_classes = package_index(uml_key, _uml_diagram).get(selected_package, [])
+        _uml_diagram = UMLDiagram.model_construct(classes=package_classes, relationships=_uml_diagram.relationships)
+    return generator.generate(_uml_diagram, selected_package)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def cached_package_graph(uml_key: str, _uml_diagram: UMLDiagram) -> graphviz.Digraph:
+    """Package diagram graph, cached per diagram"""
+    return generator.generate_package_diagram(_uml_diagram)
+
+
+# The cached renders raise on failure instead of returning the generator's error image,
+# so a failed render (e.g. Graphviz briefly unavailable) is retried on the next rerun
+@st.cache_data(show_spinner=False)
+def cached_class_svg(uml_key: str, _uml_diagram: UMLDiagram, selected_package: Optional[str] = None) -> str:
+    """Class diagram SVG, cached per diagram and package filter"""
+    return pipe_cached(cached_class_graph(uml_key, _uml_diagram, selected_package)).decode('utf-8')
+
+
+def class_svg(uml_key: str, uml_diagram: UMLDiagram, selected_package: Optional[str] = None) -> str:
+    """Class diagram SVG, or the generator's error SVG (not cached) if rendering fails"""
+    try:
+        return cached_class_svg(uml_key, uml_diagram, selected_package)
+    except Exception:
+        return generator.generate_svg(uml_diagram, selected_package)
+
+
+# A resource cache so the grouped class objects are shared rather than copied on every hit
+@st.cache_resource(show_spinner=False, max_entries=16)
+def package_index(uml_key: str, _uml_diagram: UMLDiagram) -> Dict[str, List[ClassDefinition]]:
+    """Classes of the diagram grouped by package, cached per diagram"""
+    index = {}
+    for cls in _uml_diagram.classes:
+        index.setdefault(cls.package, []).append(cls)
+    return index
+
+
+@st.cache_data(show_spinner=False)
+def cached_download_data(uml_key: str, _uml_diagram: UMLDiagram, file_format: str, diagram_type: str = "class", selected_package: Optional[str] = None):
+    """Diagram download payload, cached per diagram, format, diagram type and package filter"""
+    if file_format == 'svg':
+        # Reuse the SVG already rendered for display instead of running Graphviz again
+        if diagram_type == "package":
+            svg_content = cached_package_svg(uml_key, _uml_diagram)
+        else:
+            svg_content = cached_class_svg(uml_key, _uml_diagram, selected_package)
+        return svg_content.encode(), 'svg', 'image/svg+xml'
+    
+    # Render the PNG from the graph already built for the displayed SVG
     if diagram_type == "package":
+        dot = cached_package_graph(uml_key, _uml_diagram)
+    else:
+        dot = cached_class_graph(uml_key, _uml_diagram, selected_package)
+    return pipe_cached(dot, 'png'), 'png', 'image/png'
+
+
+def download_data(uml_key: str, uml_diagram: UMLDiagram, file_format: str, diagram_type: str = "class", selected_package: Optional[str] = None):
+    """Diagram download payload, or the generator's error image (not cached) if rendering fails"""
+    try:
+        return cached_download_data(uml_key, uml_diagram, file_format, diagram_type, selected_package)
+    except Exception:
         if file_format == 'svg':
-            svg_content = generator.generate_package_svg(diagram)
-            b64 = base64.b64encode(svg_content.encode()).decode()
-            href = f'data:image/svg+xml;base64,{b64}'
-            return href, 'svg'
-        else:  # PNG
-            png_bytes = generator.generate_package_png_bytes(diagram)
-            b64 = base64.b64encode(png_bytes).decode()
-            href = f'data:image/png;base64,{b64}'
-            return href, 'png'
-    else:  # Class diagram (default)
-        if file_format == 'svg':
-            svg_content = generator.generate_svg(diagram, selected_package)
-            b64 = base64.b64encode(svg_content.encode()).decode()
-            href = f'data:image/svg+xml;base64,{b64}'
-            return href, 'svg'
-        else:  # PNG
-            png_bytes = generator.generate_png_bytes(diagram, selected_package)
-            b64 = base64.b64encode(png_bytes).decode()
-            href = f'data:image/png;base64,{b64}'
-            return href, 'png'
-        
-def process_zip_file(uploaded_zip, language: str, selected_folders=None):
-    """Process a zip file containing code files
+            if diagram_type == "package":
+                return generator.generate_package_svg(uml_diagram).encode(), 'svg', 'image/svg+xml'
+            return generator.generate_svg(uml_diagram, selected_package).encode(), 'svg', 'image/svg+xml'
+        if diagram_type == "package":
+            return generator.generate_package_png_bytes(uml_diagram), 'png', 'image/png'
+        return generator.generate_png_bytes(uml_diagram, selected_package), 'png', 'image/png'
+
+
+@st.cache_data(show_spinner=False)
+def cached_package_svg(uml_key: str, _uml_diagram: UMLDiagram) -> str:
+    """Package diagram SVG, cached per diagram"""
+    return pipe_cached(cached_package_graph(uml_key, _uml_diagram)).decode('utf-8')
+
+
+def package_svg(uml_key: str, uml_diagram: UMLDiagram) -> str:
+    """Package diagram SVG, or the generator's error SVG (not cached) if rendering fails"""
+    try:
+        return cached_package_svg(uml_key, uml_diagram)
+    except Exception:
+        return generator.generate_package_svg(uml_diagram)
+
+
+def zip_entry_path(filename: str) -> str:
+    """Normalize a ZIP entry name to the relative path extracting it would give
+    
+    Leading slashes and backslashes and a drive letter are dropped, along with
+    empty, '.' and '..' parts, so the path can't point above the archive root.
+    
+    Args:
+        filename: The entry name as stored in the archive
+    """
+    path = filename.lstrip('/\\')
+    drive = ZIP_DRIVE_PATTERN.match(path)
+    if drive:
+        path = path[drive.end():].lstrip('/\\')
+    return '/'.join(part for part in path.split('/') if part not in ('', '.', '..'))
+
+
+def scan_zip_folders(zip_file: zipfile.ZipFile) -> List[str]:
+    """List the folders in a ZIP file
+    
+    Only the archive's central directory is read; no entries are decompressed.
     
     Args:
-        uploaded_zip: The uploaded ZIP file
+        zip_file: The opened ZIP file
+    """
+    folders = set()
+    for info in zip_file.infolist():
+        path = zip_entry_path(info.filename)
+        folder = path if info.is_dir() else os.path.dirname(path)
+        # Include every parent folder, as a directory walk of the extracted files would
+        while folder:
+            folders.add(folder)
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                break
+            folder = parent
+    
+    return sorted(folders)
+
+
+def iter_zip_sources(zip_file: zipfile.ZipFile, language: str, selected_folders=None):
+    """Yield (file path, code) pairs for the code files in a ZIP file
+    
+    The matching entries are picked from the archive directory first, then
+    decompressed on a thread pool (zlib releases the GIL while inflating).
+    
+    Args:
+        zip_file: The opened ZIP file
         language: Programming language to filter files by extension
         selected_folders: Optional list of folders to include (if None, include all)
     """
-    # Create a temporary directory
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Write zip content to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_zip:
-            temp_zip.write(uploaded_zip.getbuffer())
-            temp_zip_path = temp_zip.name
-        
-        # Extract the zip file
-        with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-        
-        # Remove the temporary zip file
-        os.unlink(temp_zip_path)
-        
-        # Find all files with the appropriate extension based on language
-        extensions = {
-            "Python": [".py"],
-            "Java": [".java"],
-            "JavaScript": [".js"]
-        }
-        
-        # Get appropriate extensions for selected language
-        file_extensions = extensions.get(language, [])
+    # Find all files with the appropriate extension based on language
+    extensions = {
+        "Python": [".py"],
+        "Java": [".java"],
+        "JavaScript": [".js"]
+    }
+    
+    # Get appropriate extensions for selected language, as a tuple for str.endswith
+    file_extensions = tuple(extensions.get(language, []))
+    
+    # Selected folders as a set, so each file checks its own ancestors instead of every selection
+    allowed_folders = set(selected_folders or [])
+    
+    members = []
+    paths = []
+    for info in zip_file.infolist():
+        if info.is_dir():
+            continue
         
-        # Initialize an empty string to store all code
-        all_code = ""
+        # Relative path as extracting the entry would give it
+        file_path = zip_entry_path(info.filename)
         
-        # Get a list of all folders in the extracted zip
-        folder_list = []
-        for root, dirs, files in os.walk(temp_dir):
-            rel_path = os.path.relpath(root, temp_dir)
-            if rel_path != '.':  # Skip the root directory
-                folder_list.append(rel_path)
+        # Check the extension first; it rules out most entries most cheaply
+        if not file_path.endswith(file_extensions):
+            continue
         
-        # Store the folder list in session state for later use
-        st.session_state.available_folders = folder_list
+        folder = os.path.dirname(file_path)
         
-        # Walk through the directory and get all relevant files
-        for root, dirs, files in os.walk(temp_dir):
-            rel_path = os.path.relpath(root, temp_dir)
-            
-            # Skip folders that aren't selected (if folders are specified)
-            if selected_folders and rel_path != '.':
-                # Check if this folder or any parent folder is selected
-                is_selected = False
-                for folder in selected_folders:
-                    if rel_path == folder or rel_path.startswith(folder + os.sep):
-                        is_selected = True
-                        break
-                
-                if not is_selected:
-                    continue
+        # Skip folders that aren't selected (if folders are specified)
+        if allowed_folders and folder:
+            # Check if this folder or any parent folder is selected
+            ancestor = folder
+            while ancestor and ancestor not in allowed_folders:
+                parent = os.path.dirname(ancestor)
+                if parent == ancestor:
+                    ancestor = ""
+                    break
+                ancestor = parent
             
-            for file in files:
-                # Check if the file has a matching extension
-                if any(file.endswith(ext) for ext in file_extensions):
-                    file_path = os.path.join(root, file)
-                    # Read the file content
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        try:
-                            code = f.read()
-                            # Add file content to combined code with a header comment
-                            all_code += f"\n\n# File: {os.path.relpath(file_path, temp_dir)}\n{code}"
-                        except Exception as e:
-                            st.warning(f"Could not read file {file}: {str(e)}")
+            if not ancestor:
+                continue
+        
+        members.append(info)
+        paths.append(file_path)
+    
+    # Decompress only the entries we keep
+    for file_path, code in zip(paths, thread_map(partial(read_zip_entry, zip_file), members)):
+        # Warnings are issued here; Streamlit calls only work on the script thread
+        if isinstance(code, Exception):
+            st.warning(f"Could not read file {os.path.basename(file_path)}: {str(code)}")
+            continue
         
-        return all_code
+        yield file_path, code
+
+
+def read_zip_entry(zip_file: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """Read and decode one ZIP entry
+    
+    Returns:
+        The entry's text, or the exception raised while reading it
+    """
+    try:
+        # Decode each entry in a single call; line endings are normalized as text mode would
+        code = zip_file.read(info).decode('utf-8', errors='ignore')
+        if '\r' in code:
+            code = code.replace('\r\n', '\n').replace('\r', '\n')
+        return code
+    except Exception as e:
+        return e
+
+
+def extract_zip_code(zip_file: zipfile.ZipFile, language: str, selected_folders=None):
+    """Extract the code files from a ZIP file into one string
+    
+    Each file is added under a '# File:' header comment, the format the parser and
+    the analysis pages split on.
+    
+    Args:
+        zip_file: The opened ZIP file
+        language: Programming language to filter files by extension
+        selected_folders: Optional list of folders to include (if None, include all)
+    """
+    # Write into one growing buffer; repeated += copies the whole string each time
+    buffer = io.StringIO()
+    
+    for file_path, code in iter_zip_sources(zip_file, language, selected_folders):
+        # Add file content to combined code with a header comment
+        buffer.write("\n\n# File: ")
+        buffer.write(file_path)
+        buffer.write("\n")
+        buffer.write(code)
+    
+    return buffer.getvalue()
+
+
+def _append_state_item(list_key: str, item: Dict[str, Any]):
+    """Button callback: append an item to a list held in session state"""
+    st.session_state[list_key].append(item)
+
+
+def _pop_state_item(list_key: str, index: int):
+    """Button callback: remove an item from a list held in session state"""
+    st.session_state[list_key].pop(index)
+
+
+def _delete_method(index: int):
+    """Button callback: remove a method and its parameter list from session state"""
+    st.session_state.current_methods.pop(index)
+    if f"params_{index}" in st.session_state:
+        del st.session_state[f"params_{index}"]
+
+
+def _clear_diagram():
+    """Button callback: reset the diagram and the editor lists"""
+    set_uml_diagram(UMLDiagram(classes=[], relationships=[]))
+    st.session_state.update({"classes": [], "current_relationships": []})
 
 
 def create_class_editor():
-    """Create UI for defining a class"""
+    """Create UI for defining a class
+    
+    Add/delete buttons mutate session state through on_click callbacks, which run
+    before the rerun triggered by the click, so no extra st.rerun() is needed.
+    """
     col1, col2 = st.columns(2)
     
     with col1:
@@ -227,26 +665,23 @@ def create_class_editor():
         with cols[2]:
             attr["visibility"] = st.selectbox(
                 "Visibility", 
-                ["+", "-", "#"], 
-                ["+", "-", "#"].index(attr["visibility"]),
+                VISIBILITY_OPTIONS, 
+                VISIBILITY_INDEX[attr["visibility"]],
                 key=f"attr_vis_{i}"
             )
         with cols[3]:
             attr["is_static"] = st.checkbox("Static", attr["is_static"], key=f"attr_static_{i}")
         with cols[4]:
-            if st.button("Delete", key=f"delete_attr_{i}"):
-                st.session_state.current_attributes.pop(i)
-                st.rerun()
+            st.button("Delete", key=f"delete_attr_{i}",
+                      on_click=_pop_state_item, args=("current_attributes", i))
     
     # Add new attribute
-    if st.button("Add Attribute"):
-        st.session_state.current_attributes.append({
-            "name": "",
-            "type": "",
-            "visibility": "+",
-            "is_static": False
-        })
-        st.rerun()
+    st.button("Add Attribute", on_click=_append_state_item, args=("current_attributes", {
+        "name": "",
+        "type": "",
+        "visibility": "+",
+        "is_static": False
+    }))
     
     st.subheader("Methods")
     
@@ -268,8 +703,8 @@ def create_class_editor():
         with cols1[2]:
             method["visibility"] = st.selectbox(
                 "Visibility", 
-                ["+", "-", "#"], 
-                ["+", "-", "#"].index(method["visibility"]),
+                VISIBILITY_OPTIONS, 
+                VISIBILITY_INDEX[method["visibility"]],
                 key=f"method_vis_{i}"
             )
         with cols1[3]:
@@ -289,68 +724,52 @@ def create_class_editor():
             with param_cols[1]:
                 param["type"] = st.text_input("Param Type", param["type"], key=f"param_type_{i}_{j}")
             with param_cols[2]:
-                if st.button("Delete Param", key=f"delete_param_{i}_{j}"):
-                    st.session_state[f"params_{i}"].pop(j)
-                    st.rerun()
+                st.button("Delete Param", key=f"delete_param_{i}_{j}",
+                          on_click=_pop_state_item, args=(f"params_{i}", j))
         
         method["parameters"] = st.session_state[f"params_{i}"]
         
         cols2 = st.columns([1, 1])
         with cols2[0]:
-            if st.button("Add Parameter", key=f"add_param_{i}"):
-                st.session_state[f"params_{i}"].append({"name": "", "type": ""})
-                st.rerun()
+            st.button("Add Parameter", key=f"add_param_{i}",
+                      on_click=_append_state_item, args=(f"params_{i}", {"name": "", "type": ""}))
         with cols2[1]:
-            if st.button("Delete Method", key=f"delete_method_{i}"):
-                st.session_state.current_methods.pop(i)
-                # Also remove params
-                if f"params_{i}" in st.session_state:
-                    del st.session_state[f"params_{i}"]
-                st.rerun()
+            st.button("Delete Method", key=f"delete_method_{i}",
+                      on_click=_delete_method, args=(i,))
         
         st.markdown("---")
     
     # Add new method
-    if st.button("Add Method"):
-        st.session_state.current_methods.append({
-            "name": "",
-            "return_type": "",
-            "parameters": [],
-            "visibility": "+",
-            "is_static": False,
-            "is_abstract": False
-        })
-        st.rerun()
+    st.button("Add Method", on_click=_append_state_item, args=("current_methods", {
+        "name": "",
+        "return_type": "",
+        "parameters": [],
+        "visibility": "+",
+        "is_static": False,
+        "is_abstract": False
+    }))
     
     # Extract data from form values
     if class_name:
-        # Convert attributes to Attribute objects
-        attr_objects = []
-        for attr in st.session_state.current_attributes:
-            attr_objects.append(
-                Attribute(
-                    name=attr["name"],
-                    type=attr["type"],
-                    visibility=attr["visibility"],
-                    is_static=attr["is_static"]
-                )
-            )
-        
-        # Convert methods to Method objects
-        method_objects = []
-        for i, method in enumerate(st.session_state.current_methods):
-            method_objects.append(
-                Method(
-                    name=method["name"],
-                    return_type=method["return_type"],
-                    parameters=method["parameters"],
-                    visibility=method["visibility"],
-                    is_static=method["is_static"],
-                    is_abstract=method["is_abstract"]
-                )
-            )
-        
-        return ClassDefinition(
+        # Most reruns change nothing in the form, so the models are only rebuilt
+        # when this snapshot of the form values differs from the last one
+        fingerprint = (
+            class_name, is_abstract, is_interface, package,
+            tuple((a["name"], a["type"], a["visibility"], a["is_static"])
+                  for a in st.session_state.current_attributes),
+            tuple((m["name"], m["return_type"], m["visibility"], m["is_static"], m["is_abstract"],
+                   tuple((p["name"], p["type"]) for p in m["parameters"]))
+                  for m in st.session_state.current_methods),
+        )
+        if st.session_state.get("class_editor_fingerprint") == fingerprint:
+            return st.session_state.class_editor_class
+
+        # Convert attributes and methods to model objects (the session-state
+        # dicts use the model field names as keys)
+        attr_objects = [Attribute(**attr) for attr in st.session_state.current_attributes]
+        method_objects = [Method(**method) for method in st.session_state.current_methods]
+
+        class_def = ClassDefinition(
             name=class_name,
             attributes=attr_objects,
             methods=method_objects,
@@ -358,7 +777,10 @@ def create_class_editor():
             is_interface=is_interface,
             package=package
         )
-    
+        st.session_state.class_editor_fingerprint = fingerprint
+        st.session_state.class_editor_class = class_def
+        return class_def
+
     return None
 
 
@@ -369,26 +791,31 @@ def create_relationship_editor(class_names: List[str]):
     if "current_relationships" not in st.session_state:
         st.session_state.current_relationships = []
     
+    # Index of each class name's first occurrence, for the selectbox defaults
+    class_index = {}
+    for i, name in enumerate(class_names):
+        class_index.setdefault(name, i)
+    
     # Display existing relationships
     for i, rel in enumerate(st.session_state.current_relationships):
         cols = st.columns([2, 2, 2, 2, 2, 1])
         
         with cols[0]:
             rel["source"] = st.selectbox("Source", class_names, 
-                                         class_names.index(rel["source"]) if rel["source"] in class_names else 0,
+                                         class_index.get(rel["source"], 0),
                                          key=f"rel_source_{i}")
         
         with cols[1]:
             rel["type"] = st.selectbox(
                 "Type", 
-                ["inheritance", "implementation", "association", "dependency", "aggregation", "composition"],
-                ["inheritance", "implementation", "association", "dependency", "aggregation", "composition"].index(rel["type"]),
+                RELATIONSHIP_TYPES,
+                RELATIONSHIP_TYPE_INDEX[rel["type"]],
                 key=f"rel_type_{i}"
             )
         
         with cols[2]:
             rel["target"] = st.selectbox("Target", class_names, 
-                                         class_names.index(rel["target"]) if rel["target"] in class_names else 0,
+                                         class_index.get(rel["target"], 0),
                                          key=f"rel_target_{i}")
         
         with cols[3]:
@@ -398,41 +825,27 @@ def create_relationship_editor(class_names: List[str]):
             rel["multiplicity"] = st.text_input("Multiplicity", rel["multiplicity"], key=f"rel_mult_{i}")
             
         with cols[5]:
-            if st.button("Delete", key=f"delete_rel_{i}"):
-                st.session_state.current_relationships.pop(i)
-                st.rerun()
+            st.button("Delete", key=f"delete_rel_{i}",
+                      on_click=_pop_state_item, args=("current_relationships", i))
     
     # Add new relationship if there are at least 2 classes
     if len(class_names) >= 2:
-        if st.button("Add Relationship"):
-            st.session_state.current_relationships.append({
-                "source": class_names[0],
-                "target": class_names[1],
-                "type": "association",
-                "label": "",
-                "multiplicity": ""
-            })
-            st.rerun()
+        st.button("Add Relationship", on_click=_append_state_item, args=("current_relationships", {
+            "source": class_names[0],
+            "target": class_names[1],
+            "type": "association",
+            "label": "",
+            "multiplicity": ""
+        }))
     else:
         st.info("Add at least two classes to create relationships")
     
     # Extract relationship objects
-    relationships = []
-    for rel in st.session_state.current_relationships:
-        relationships.append(
-            Relationship(
-                source=rel["source"],
-                target=rel["target"],
-                type=rel["type"],
-                label=rel["label"],
-                multiplicity=rel["multiplicity"]
-            )
-        )
-    
-    return relationships
+    return [Relationship(**rel) for rel in st.session_state.current_relationships]
 
 
-def create_hierarchy_explorer(uml_diagram: UMLDiagram, selected_package: Optional[str] = None):
+def create_hierarchy_explorer(uml_diagram: UMLDiagram, selected_package: Optional[str] = None,
+                              classes_by_package: Optional[Dict[str, List[ClassDefinition]]] = None):
     """Create an interactive class hierarchy explorer
     
     This component shows inheritance relationships between classes with hover effects
@@ -441,6 +854,8 @@ def create_hierarchy_explorer(uml_diagram: UMLDiagram, selected_package: Optiona
     Args:
         uml_diagram: The UML diagram to visualize
         selected_package: Optional package name to filter by
+        classes_by_package: Optional prebuilt package -> classes index, used instead of
+            scanning every class for the package filter
     """
     if not uml_diagram.classes:
         st.info("No classes to display in the hierarchy explorer.")
@@ -449,14 +864,21 @@ def create_hierarchy_explorer(uml_diagram: UMLDiagram, selected_package: Optiona
     # Filter classes by package if selected
     classes_to_display = uml_diagram.classes
     if selected_package and selected_package != "All Packages":
-        classes_to_display = [cls for cls in uml_diagram.classes if cls.package == selected_package]
+        if classes_by_package is not None:
+            classes_to_display = classes_by_package.get(selected_package, [])
+        else:
+            classes_to_display = [cls for cls in uml_diagram.classes if cls.package == selected_package]
     
     # Find all inheritance relationships
     inheritance_relations = [rel for rel in uml_diagram.relationships 
                              if rel.type in ["inheritance", "implementation"]]
     
-    # Build a hierarchy map: parent -> [children]
+    # Find all available class names
+    all_classes = {cls.name for cls in classes_to_display}
+    
+    # Build a hierarchy map: parent -> [children], noting the children whose parent is displayed
     hierarchy_map = {}
+    children_with_displayed_parent = set()
     for rel in inheritance_relations:
         child = rel.source
         parent = rel.target
@@ -464,30 +886,19 @@ def create_hierarchy_explorer(uml_diagram: UMLDiagram, selected_package: Optiona
         if parent not in hierarchy_map:
             hierarchy_map[parent] = []
         hierarchy_map[parent].append(child)
+        
+        if parent in all_classes:
+            children_with_displayed_parent.add(child)
     
-    # Find all classes that are children
-    all_children = set()
-    for children in hierarchy_map.values():
-        all_children.update(children)
+    # Root classes are those with no displayed parent
+    root_classes = all_classes - children_with_displayed_parent
     
-    # Find all available class names
-    all_classes = {cls.name for cls in classes_to_display}
-    
-    # Find root classes (those that don't inherit from others)
-    root_classes = all_classes - all_children
-    
-    # Add classes that have no displayed parents as roots
-    for class_name in all_classes:
-        if class_name in all_children:
-            # Check if this class's parent is in the displayed classes
-            parent_found = False
-            for rel in inheritance_relations:
-                if rel.source == class_name and rel.target in all_classes:
-                    parent_found = True
-                    break
-            
-            if not parent_found:
-                root_classes.add(class_name)
+    # Lookups shared by every display_class_details call; the first class with a given name wins
+    classes_by_name = {}
+    for cls in classes_to_display:
+        classes_by_name.setdefault(cls.name, cls)
+    displayed_children = {parent: sorted(child for child in children if child in all_classes)
+                          for parent, children in hierarchy_map.items()}
     
     # Display instructions for the hierarchy explorer
     st.markdown("""
@@ -498,32 +909,42 @@ def create_hierarchy_explorer(uml_diagram: UMLDiagram, selected_package: Optiona
     
     # Create a tab for each root class with unique keys
     if root_classes:
-        # Create a unique key suffix for this set of tabs
-        import random 
-        root_tabs_key = f"root_tabs_{random.randint(1000, 9999)}"
-        
         # Create tabs (note: can't add keys directly to tabs in this version of Streamlit)
         tabs = st.tabs([f"📌 {root}" for root in sorted(root_classes)])
         
         for i, root in enumerate(sorted(root_classes)):
             with tabs[i]:
-                display_class_details(root, classes_to_display, hierarchy_map, all_classes)
+                # The child clicked last in this tab is kept in session state and shown
+                # below the root, so only two classes are rendered however deep it is
+                focus_key = f"hierarchy_focus_{root}"
+                display_class_details(root, classes_by_name, displayed_children, focus_key)
+                
+                focused_class = st.session_state.get(focus_key)
+                if focused_class and focused_class != root and focused_class in all_classes:
+                    st.markdown("---")
+                    st.markdown(f"### Child: {focused_class}")
+                    display_class_details(focused_class, classes_by_name, displayed_children, focus_key)
     else:
         st.info("No root classes found in the diagram.")
 
 
-def display_class_details(class_name: str, classes: List[ClassDefinition], 
-                         hierarchy_map: Dict[str, List[str]], all_class_names: set):
+def _focus_class(focus_key: str, class_name: str):
+    """Button callback: show a class's details in a hierarchy explorer tab"""
+    st.session_state[focus_key] = class_name
+
+
+def display_class_details(class_name: str, classes_by_name: Dict[str, ClassDefinition],
+                         displayed_children: Dict[str, List[str]], focus_key: str):
     """Display details for a class and its children
     
     Args:
         class_name: Name of the class to display
-        classes: List of all class definitions
-        hierarchy_map: Map of parent classes to their children
-        all_class_names: Set of all class names in the current view
+        classes_by_name: Map of class names to the class definitions in the current view
+        displayed_children: Map of parent classes to their sorted children in the current view
+        focus_key: Session state key that the child buttons set to the clicked class
     """
     # Find class definition
-    class_def = next((cls for cls in classes if cls.name == class_name), None)
+    class_def = classes_by_name.get(class_name)
     if not class_def:
         st.warning(f"Class definition for '{class_name}' not found.")
         return
@@ -546,20 +967,25 @@ def display_class_details(class_name: str, classes: List[ClassDefinition],
         # Attributes tab
         with class_tabs[0]:
             if class_def.attributes:
+                # Render all attribute rows with a single markdown element
+                attribute_rows = []
                 for attr in class_def.attributes:
                     visibility_text = {"+" : "public", "-" : "private", "#" : "protected"}[attr.visibility]
                     static_text = "static " if attr.is_static else ""
-                    st.markdown(f"""
+                    attribute_rows.append(f"""
                     <div style="margin-bottom: 5px; padding: 5px; background-color: #f9f9f9; border-left: 3px solid #2196F3;">
                         <span style="color: #666;">{visibility_text}</span> {static_text}<strong>{attr.name}</strong>: <span style="color: #007ACC;">{attr.type}</span>
                     </div>
-                    """, unsafe_allow_html=True)
+                    """)
+                st.markdown("".join(attribute_rows), unsafe_allow_html=True)
             else:
                 st.info("No attributes defined for this class.")
         
         # Methods tab
         with class_tabs[1]:
             if class_def.methods:
+                # Render all method rows with a single markdown element
+                method_rows = []
                 for method in class_def.methods:
                     visibility_text = {"+" : "public", "-" : "private", "#" : "protected"}[method.visibility]
                     abstract_text = "abstract " if method.is_abstract else ""
@@ -568,146 +994,181 @@ def display_class_details(class_name: str, classes: List[ClassDefinition],
                     # Format parameters
                     params = ", ".join([f"{p['name']}: {p['type']}" for p in method.parameters])
                     
-                    st.markdown(f"""
+                    method_rows.append(f"""
                     <div style="margin-bottom: 8px; padding: 5px; background-color: #f9f9f9; border-left: 3px solid #FFA000;">
                         <span style="color: #666;">{visibility_text}</span> {abstract_text}{static_text}<strong>{method.name}</strong>({params}): <span style="color: #007ACC;">{method.return_type}</span>
                     </div>
-                    """, unsafe_allow_html=True)
+                    """)
+                st.markdown("".join(method_rows), unsafe_allow_html=True)
             else:
                 st.info("No methods defined for this class.")
         
         # Children tab - show all classes that inherit from this one
         with class_tabs[2]:
-            if class_name in hierarchy_map and hierarchy_map[class_name]:
-                children = [child for child in hierarchy_map[class_name] if child in all_class_names]
+            children = displayed_children.get(class_name)
+            if children is not None:
                 if children:
                     child_cols = st.columns(min(3, len(children)))
-                    for i, child in enumerate(sorted(children)):
+                    for i, child in enumerate(children):
                         with child_cols[i % 3]:
                             # Find the child class definition
-                            child_class = next((cls for cls in classes if cls.name == child), None)
+                            child_class = classes_by_name.get(child)
                             if child_class:
                                 class_type = "Interface" if child_class.is_interface else "Abstract" if child_class.is_abstract else "Class"
                                 # Create a unique key by adding an index to avoid duplicates
-                                button_key = f"child_{class_name}_{child}_{i}"
-                                if st.button(f"{child} ({class_type})", key=button_key):
-                                    # Show details for the selected child class
-                                    st.markdown("---")
-                                    st.markdown(f"### Child: {child}")
-                                    
-                                    # Add a random suffix to the session state key to avoid conflicts
-                                    # when recursively viewing child classes
-                                    import random
-                                    suffix = random.randint(10000, 99999)
-                                    
-                                    # Create a container for child details to isolate them
-                                    with st.container():
-                                        display_class_details(child, classes, hierarchy_map, all_class_names)
+                                button_key = f"child_{focus_key}_{class_name}_{child}_{i}"
+                                # Focus the child; the explorer renders it below the root class
+                                st.button(f"{child} ({class_type})", key=button_key,
+                                          on_click=_focus_class, args=(focus_key, child))
                 else:
                     st.info("No children classes in the current view.")
             else:
                 st.info("No children classes inherit from this class.")
 
 
-def analyze_demographic_data(code: str) -> Dict:
+def generate_hierarchy_table(uml_diagram: UMLDiagram) -> pd.DataFrame:
     """
-    Analyze Java code for potential demographic data fields and occurrences
+    Generate a tabular representation of class hierarchies and relationships
     
-    Returns a dictionary of files, fields, and occurrences
+    Returns a pandas DataFrame with class relationships
     """
-    demographic_keywords = [
-        "gender", "sex", "race", "ethnicity", "nationality", "religion", 
-        "age", "dateOfBirth", "birthDate", "dob", "ssn", "socialSecurity",
-        "passport", "disability", "marital", "income", "salary", "address",
-        "zipCode", "postalCode", "phone", "email", "firstName", "lastName",
-        "fullName", "name"
-    ]
-    
-    results = {}
-    file_pattern = r'# File: (.+?)[\r\n]+'
-    
-    # Find all files in the code
-    files = re.findall(file_pattern, code)
-    
-    for file in files:
-        # Extract file content
-        file_pattern_specific = r'# File: ' + re.escape(file) + r'[\r\n]+(.+?)(?=# File:|$)'
-        file_matches = re.findall(file_pattern_specific, code, re.DOTALL)
-        
-        if file_matches:
-            file_content = file_matches[0]
-            
-            # Look for demographic keywords
-            file_results = []
-            found_fields = set()  # To track unique fields already found
-            
-            for keyword in demographic_keywords:
-                # Various patterns to match demographic data fields
-                patterns = [
-                    # Field declaration
-                    r'(?:private|protected|public)\s+\w+\s+(' + keyword + r'\w*)',
-                    # Camel case variations
-                    r'(?:private|protected|public)\s+\w+\s+(\w*' + keyword.capitalize() + r'\w*)',
-                    # Getter/setter methods
-                    r'(?:get|set)(' + keyword.capitalize() + r'\w*)\s*\(',
-                ]
-                
-                for pattern in patterns:
-                    matches = re.findall(pattern, file_content, re.IGNORECASE)
-                    for match in matches:
-                        # Only add the field if it hasn't been found yet
-                        if match.lower() not in found_fields:
-                            found_fields.add(match.lower())
-                            occurrence = {
-                                "field": match,
-                                "keyword": keyword,
-                                "count": len(re.findall(r'\b' + re.escape(match) + r'\b', file_content))
-                            }
-                            file_results.append(occurrence)
-            
-            if file_results:
-                results[file] = file_results
+    relationships = uml_diagram.relationships
+    
+    # Package of each class name; the first class with a given name wins
+    package_by_name = {}
+    for cls in uml_diagram.classes:
+        package_by_name.setdefault(cls.name, cls.package or "Default")
     
-    return results
+    # Build the table column by column
+    return pd.DataFrame({
+        "Source Class": [rel.source for rel in relationships],
+        "Source Package": [package_by_name.get(rel.source, "Default") for rel in relationships],
+        "Relationship Type": [rel.type.capitalize() for rel in relationships],
+        "Target Class": [rel.target for rel in relationships],
+        "Target Package": [package_by_name.get(rel.target, "Default") for rel in relationships],
+        "Label": [rel.label for rel in relationships],
+        "Multiplicity": [rel.multiplicity for rel in relationships]
+    })
 
 
-def generate_hierarchy_table(uml_diagram: UMLDiagram) -> pd.DataFrame:
-    """
-    Generate a tabular representation of class hierarchies and relationships
+@st.fragment
+def render_diagram_section():
+    """Render the diagram for the current session
     
-    Returns a pandas DataFrame with class relationships
+    Runs as a fragment, so the diagram type, package filter and clear widgets rerun
+    only this section rather than the whole script with its upload handling.
     """
-    relationships_data = []
-    
-    for rel in uml_diagram.relationships:
-        # Find source and target class definitions
-        source_class = next((cls for cls in uml_diagram.classes if cls.name == rel.source), None)
-        target_class = next((cls for cls in uml_diagram.classes if cls.name == rel.target), None)
-        
-        source_package = source_class.package if source_class and source_class.package else "Default"
-        target_package = target_class.package if target_class and target_class.package else "Default"
-        
-        # Create a record for this relationship
-        relationship = {
-            "Source Class": rel.source,
-            "Source Package": source_package,
-            "Relationship Type": rel.type.capitalize(),
-            "Target Class": rel.target,
-            "Target Package": target_package,
-            "Label": rel.label,
-            "Multiplicity": rel.multiplicity
-        }
+    uml_diagram = st.session_state.uml_diagram
+    uml_key = st.session_state.uml_key
+    if uml_diagram.classes:
+        # Display diagram info
+        class_count = len(uml_diagram.classes)
+        relationship_count = len(uml_diagram.relationships)
+        st.info(f"Diagram contains {class_count} classes and {relationship_count} relationships")
         
-        relationships_data.append(relationship)
-    
-    # Convert to DataFrame
-    return pd.DataFrame(relationships_data)
+        # Display diagram
+        try:
+            # Validate diagram data before generating
+            if not uml_diagram.classes:
+                st.warning("The diagram doesn't contain any classes. Make sure the uploaded ZIP file has valid Java code.")
+                return
+                
+            # Get list of packages to filter by (shared by the class diagram and explorer filters)
+            packages = cached_package_options(uml_key, uml_diagram)
+            
+            # Select diagram type
+            diagram_type = st.radio("Diagram Type", ["Class Diagram", "Package Diagram", "Hierarchy Explorer"], horizontal=True)
+            
+            # Generate diagram with enhanced error handling
+            try:
+                if diagram_type == "Class Diagram":
+                    st.subheader("Class Diagram")
+                    
+                    # Package filter dropdown
+                    selected_package = st.selectbox("Filter by Package", packages, key="package_filter")
+                    
+                    # Apply package filter or show all classes
+                    if selected_package == "All Packages":
+                        svg_content = class_svg(uml_key, uml_diagram)
+                    else:
+                        svg_content = class_svg(uml_key, uml_diagram, selected_package)
+                    
+                    components.html(svg_content, height=DIAGRAM_HEIGHT, scrolling=True)
+                    
+                    # Download options
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        download_format = st.selectbox("Download Format", ["SVG", "PNG"], key="class_download_format")
+                    
+                    with col2:
+                        # Pass selected package to download generation
+                        if selected_package == "All Packages":
+                            data, ext, mime = download_data(uml_key, uml_diagram, download_format.lower(), "class")
+                        else:
+                            data, ext, mime = download_data(uml_key, uml_diagram, download_format.lower(), "class", selected_package)
+                            
+                        st.download_button(
+                            "Download Class Diagram",
+                            data=data,
+                            file_name=f"class_diagram.{ext}",
+                            mime=mime
+                        )
+                elif diagram_type == "Package Diagram":
+                    st.subheader("Package Diagram")
+                    svg_content = package_svg(uml_key, uml_diagram)
+                    components.html(svg_content, height=DIAGRAM_HEIGHT, scrolling=True)
+                    
+                    # Download options
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        download_format = st.selectbox("Download Format", ["SVG", "PNG"], key="package_download_format")
+                    
+                    with col2:
+                        data, ext, mime = download_data(uml_key, uml_diagram, download_format.lower(), "package")
+                        st.download_button(
+                            "Download Package Diagram",
+                            data=data,
+                            file_name=f"package_diagram.{ext}",
+                            mime=mime
+                        )
+                else:  # Hierarchy Explorer
+                    st.subheader("Interactive Class Hierarchy Explorer")
+                    
+                    # Package filter dropdown
+                    selected_package = st.selectbox("Filter by Package", packages, key="hierarchy_package_filter")
+                    
+                    # Apply the package filter to the hierarchy explorer
+                    create_hierarchy_explorer(
+                        uml_diagram,
+                        selected_package,
+                        package_index(uml_key, uml_diagram)
+                    )
+                
+                # Clear diagram button; the callback runs before the next script run,
+                # so that run already renders the empty diagram
+                st.button("Clear Diagram", on_click=_clear_diagram)
+            except Exception as e:
+                st.error(f"Error rendering diagram: {str(e)}")
+                st.info("Try uploading a different ZIP file with Java code.")
+                
+        except Exception as e:
+            st.error(f"Error generating diagram: {str(e)}")
+            st.info("There might be an issue with the diagram generation. Please try uploading a different Java code ZIP file.")
+    else:
+        st.info("No diagram to display. Please upload a ZIP file to generate a diagram.")
 
 
 def main():
     """Main function to run the Streamlit app"""
     st.title("JUML - UML Class Diagram Generator")
     
+    # Emitted on every run: Streamlit removes elements a run doesn't re-emit
+    st.markdown(DOWNLOAD_BUTTON_CSS, unsafe_allow_html=True)
+    
+    # Initialize session state for the UML diagram before any page reads it
+    if 'uml_diagram' not in st.session_state:
+        set_uml_diagram(UMLDiagram(classes=[], relationships=[]))
+    
     # Sidebar for navigation
     sidebar_option = st.sidebar.radio(
         "Navigation",
@@ -726,8 +1187,12 @@ def main():
     if sidebar_option == "Data Analysis":
         st.header("Code Data Analysis")
         
+        # Bind the diagram once for this page
+        uml_diagram = st.session_state.uml_diagram
+        uml_key = st.session_state.uml_key
+        
         # Ensure we have a UML diagram
-        if 'uml_diagram' not in st.session_state or not st.session_state.uml_diagram.classes:
+        if not uml_diagram.classes:
             st.warning("No data available for analysis. Please upload a ZIP file with Java code first.")
             return
             
@@ -738,10 +1203,13 @@ def main():
         demographic_data = {}
         if 'uploaded_code' in st.session_state:
             code = st.session_state.uploaded_code
-            demographic_data = analyze_demographic_data(code)
+            demographic_data = cached_demographic_data(st.session_state.code_hash, code)
+        
+        # Joined field names and details per file, shared by both summary tabs
+        demographic_index = build_demographic_index(demographic_data)
         
         # Generate hierarchy table
-        hierarchy_df = generate_hierarchy_table(st.session_state.uml_diagram)
+        hierarchy_df = cached_hierarchy_table(uml_key, uml_diagram)
         
         # Summary Tab
         with summary_tab:
@@ -750,9 +1218,9 @@ def main():
             # Create overall metrics
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Total Classes", len(st.session_state.uml_diagram.classes))
+                st.metric("Total Classes", len(uml_diagram.classes))
             with col2:
-                st.metric("Total Relationships", len(st.session_state.uml_diagram.relationships))
+                st.metric("Total Relationships", len(uml_diagram.relationships))
             with col3:
                 total_demographic_fields = sum(len(occurrences) for occurrences in demographic_data.values()) if demographic_data else 0
                 st.metric("Demographic Data Fields", total_demographic_fields)
@@ -760,102 +1228,50 @@ def main():
             # Class structure summary
             st.subheader("Class Structure Summary")
             
-            # Collect package statistics
-            packages = {}
-            for cls in st.session_state.uml_diagram.classes:
-                package_name = cls.package if cls.package else "Default"
-                if package_name not in packages:
-                    packages[package_name] = 0
-                packages[package_name] += 1
-            
             # Package statistics
-            if packages:
+            package_counts_df = cached_package_counts(uml_key, uml_diagram)
+            if not package_counts_df.empty:
                 st.write("**Classes by Package:**")
-                package_data = [{"Package": pkg, "Number of Classes": count} for pkg, count in packages.items()]
-                st.dataframe(pd.DataFrame(package_data), use_container_width=True)
+                st.dataframe(package_counts_df, use_container_width=True)
             
             # File Summary Table
             st.subheader("Java File Summary")
             if 'uploaded_code' in st.session_state:
-                # Extract all Java files from the code for analysis
-                java_files = []
-                code_chunks = st.session_state.uploaded_code.split("# File: ")
+                # Classify each file once per upload; both summary tabs read the result
+                file_classes = cached_file_classification(st.session_state.code_hash, st.session_state.uploaded_code)
                 
-                # Skip the first empty chunk
-                for chunk in code_chunks[1:]:
-                    lines = chunk.strip().split("\n", 1)
-                    if len(lines) >= 2:
-                        file_path = lines[0].strip()
-                        content = lines[1]
-                        java_files.append({
-                            "file_path": file_path,
-                            "content": content
-                        })
-                
-                # Create summary for each file
-                file_summaries = []
-                for file_info in java_files:
+                # Create summary for each file, one list per table column
+                file_summaries = {
+                    "File": [], "Purpose": [], "Classes": [], "Interfaces": [], "Methods": [],
+                    "Contains Demographic Data": [], "Demographic Fields": []
+                }
+                for file_info in file_classes:
                     file_path = file_info["file_path"]
-                    content = file_info["content"]
-                    
-                    # Count classes, methods and attributes
-                    class_count = len(re.findall(r'class\s+\w+', content))
-                    interface_count = len(re.findall(r'interface\s+\w+', content))
-                    method_count = len(re.findall(r'(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\([^)]*\)', content))
-                    
-                    # Determine primary purpose based on keywords and patterns
-                    purpose = "Unknown"
-                    if re.search(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Controller|Resource|RestController|Handler)', content, re.IGNORECASE):
-                        purpose = "Controller/API"
-                    elif re.search(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Repository|DAO)', content, re.IGNORECASE):
-                        purpose = "Data Access"
-                    elif re.search(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Service|Manager)', content, re.IGNORECASE):
-                        purpose = "Service"
-                    elif re.search(r'@Entity|@Table', content, re.IGNORECASE):
-                        purpose = "Entity/Model"
-                    elif re.search(r'class\s+.*?(?:Exception|Error)\s*\{', content, re.IGNORECASE):
-                        purpose = "Exception"
-                    elif re.search(r'interface\s+\w+', content, re.IGNORECASE):
-                        purpose = "Interface"
-                    elif class_count > 0 and method_count == 0:
-                        purpose = "Data Class"
-                    elif re.search(r'enum\s+\w+', content, re.IGNORECASE):
-                        purpose = "Enumeration"
-                    elif class_count > 0:
-                        purpose = "Business Logic"
                     
                     # Check for demographic data
-                    has_demographic_data = False
-                    demographic_fields = []
-                    
-                    if demographic_data and file_path in demographic_data:
-                        has_demographic_data = True
-                        demographic_fields = [item["field"] for item in demographic_data[file_path]]
+                    has_demographic_data = file_path in demographic_index
                     
                     # Add to summary table
-                    file_summaries.append({
-                        "File": file_path,
-                        "Purpose": purpose,
-                        "Classes": class_count,
-                        "Interfaces": interface_count, 
-                        "Methods": method_count,
-                        "Contains Demographic Data": "Yes" if has_demographic_data else "No",
-                        "Demographic Fields": ", ".join(demographic_fields) if demographic_fields else "None"
-                    })
+                    file_summaries["File"].append(file_path)
+                    file_summaries["Purpose"].append(file_info["purpose"])
+                    file_summaries["Classes"].append(file_info["class_count"])
+                    file_summaries["Interfaces"].append(file_info["interface_count"])
+                    file_summaries["Methods"].append(file_info["method_count"])
+                    file_summaries["Contains Demographic Data"].append("Yes" if has_demographic_data else "No")
+                    file_summaries["Demographic Fields"].append(demographic_index[file_path][0] if has_demographic_data else "None")
                 
                 # Display the summary table
-                if file_summaries:
-                    st.dataframe(pd.DataFrame(file_summaries), use_container_width=True)
+                if file_summaries["File"]:
+                    # Build the table once for display and download
+                    file_summary_df = arrow_backed(pd.DataFrame(file_summaries))
+                    st.dataframe(file_summary_df, use_container_width=True)
                     
                     # Add download option
-                    csv = pd.DataFrame(file_summaries).to_csv(index=False)
-                    b64 = base64.b64encode(csv.encode()).decode()
-                    href = f'data:file/csv;base64,{b64}'
-                    st.markdown(
-                        f'<a href="{href}" download="java_file_summary.csv"><button style="padding: 0.5em 1em; '
-                        f'background-color: #4CAF50; color: white; border: none; '
-                        f'border-radius: 4px; cursor: pointer;">Download File Summary (CSV)</button></a>',
-                        unsafe_allow_html=True
+                    st.download_button(
+                        "Download File Summary (CSV)",
+                        data=file_summary_df.to_csv(index=False).encode(),
+                        file_name="java_file_summary.csv",
+                        mime="text/csv"
                     )
                 else:
                     st.warning("No Java files were found for analysis.")
@@ -864,28 +1280,17 @@ def main():
             st.subheader("Demographic Data Summary")
             if demographic_data:
                 # Create a consolidated summary of all demographic data
-                all_fields = []
-                for file, occurrences in demographic_data.items():
-                    for occurrence in occurrences:
-                        all_fields.append({
-                            "File": file,
-                            "Field": occurrence["field"],
-                            "Type": occurrence["keyword"],
-                            "Occurrences": occurrence["count"]
-                        })
+                all_fields_df = cached_demographic_table(st.session_state.code_hash, demographic_data)
                 
-                if all_fields:
-                    st.dataframe(pd.DataFrame(all_fields), use_container_width=True)
+                if not all_fields_df.empty:
+                    st.dataframe(all_fields_df, use_container_width=True)
                     
                     # Add download option for the summary
-                    csv = pd.DataFrame(all_fields).to_csv(index=False)
-                    b64 = base64.b64encode(csv.encode()).decode()
-                    href = f'data:file/csv;base64,{b64}'
-                    st.markdown(
-                        f'<a href="{href}" download="demographic_data_summary.csv"><button style="padding: 0.5em 1em; '
-                        f'background-color: #4CAF50; color: white; border: none; '
-                        f'border-radius: 4px; cursor: pointer;">Download Demographic Data Summary (CSV)</button></a>',
-                        unsafe_allow_html=True
+                    st.download_button(
+                        "Download Demographic Data Summary (CSV)",
+                        data=all_fields_df.to_csv(index=False).encode(),
+                        file_name="demographic_data_summary.csv",
+                        mime="text/csv"
                     )
             else:
                 st.success("No obvious demographic data fields were found in the code.")
@@ -893,8 +1298,7 @@ def main():
             # Relationship statistics
             if not hierarchy_df.empty:
                 st.subheader("Relationship Type Summary")
-                relationship_counts = hierarchy_df["Relationship Type"].value_counts().reset_index()
-                relationship_counts.columns = ["Relationship Type", "Count"]
+                relationship_counts = cached_relationship_counts(uml_key, hierarchy_df)
                 st.dataframe(relationship_counts, use_container_width=True)
         # Demographic Summary Tab
         with demo_summary_tab:
@@ -903,90 +1307,30 @@ def main():
             
             if 'uploaded_code' in st.session_state:
                 if demographic_data:
-                    # Extract all Java files from the code for analysis
-                    java_files = []
-                    code_chunks = st.session_state.uploaded_code.split("# File: ")
+                    file_classes = cached_file_classification(st.session_state.code_hash, st.session_state.uploaded_code)
                     
-                    # Skip the first empty chunk
-                    for chunk in code_chunks[1:]:
-                        lines = chunk.strip().split("\n", 1)
-                        if len(lines) >= 2:
-                            file_path = lines[0].strip()
-                            content = lines[1]
-                            java_files.append({
-                                "file_path": file_path,
-                                "content": content
-                            })
-                    
-                    # Create summary of only files with demographic data
-                    demographic_file_summaries = []
-                    
-                    for file_info in java_files:
-                        file_path = file_info["file_path"]
-                        content = file_info["content"]
-                        
-                        # Only include files with demographic data
-                        if demographic_data and file_path in demographic_data:
-                            # Determine primary purpose based on keywords and patterns
-                            purpose = "Unknown"
-                            if re.search(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Controller|Resource|RestController|Handler)', content, re.IGNORECASE):
-                                purpose = "Controller/API"
-                            elif re.search(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Repository|DAO)', content, re.IGNORECASE):
-                                purpose = "Data Access"
-                            elif re.search(r'class\s+\w+\s+(?:extends|implements)\s+.*?(?:Service|Manager)', content, re.IGNORECASE):
-                                purpose = "Service"
-                            elif re.search(r'@Entity|@Table', content, re.IGNORECASE):
-                                purpose = "Entity/Model"
-                            elif re.search(r'class\s+.*?(?:Exception|Error)\s*\{', content, re.IGNORECASE):
-                                purpose = "Exception"
-                            elif re.search(r'interface\s+\w+', content, re.IGNORECASE):
-                                purpose = "Interface"
-                            elif len(re.findall(r'class\s+\w+', content)) > 0 and len(re.findall(r'(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\([^)]*\)', content)) == 0:
-                                purpose = "Data Class"
-                            elif re.search(r'enum\s+\w+', content, re.IGNORECASE):
-                                purpose = "Enumeration"
-                            elif len(re.findall(r'class\s+\w+', content)) > 0:
-                                purpose = "Business Logic"
-                            
-                            # Get demographic fields
-                            demographic_fields = [item["field"] for item in demographic_data[file_path]]
-                            
-                            # Add summary
-                            summary_text = f"This {purpose.lower()} file contains demographic data fields: {', '.join(demographic_fields)}"
-                            
-                            # Get specific demographic field details
-                            field_details = []
-                            for item in demographic_data[file_path]:
-                                field_details.append(f"{item['field']} ({item['keyword']})")
-                                
-                            # Add to summary table
-                            demographic_file_summaries.append({
-                                "File": file_path,
-                                "File Type": purpose,
-                                "Summary": summary_text,
-                                "Demographic Fields": ", ".join(demographic_fields),
-                                "Field Details": ", ".join(field_details)
-                            })
+                    # Summarize only the files with demographic data, streamed straight into the table
+                    demographic_files_df = arrow_backed(pd.DataFrame.from_records(
+                        iter_demographic_file_summaries(file_classes, demographic_index),
+                        columns=["File", "File Type", "Summary", "Demographic Fields", "Field Details"]
+                    ))
                     
                     # Display the demographic summary table
-                    if demographic_file_summaries:
-                        st.write(f"**Found {len(demographic_file_summaries)} files containing demographic data:**")
-                        st.dataframe(pd.DataFrame(demographic_file_summaries), use_container_width=True)
+                    if not demographic_files_df.empty:
+                        st.write(f"**Found {len(demographic_files_df)} files containing demographic data:**")
+                        st.dataframe(demographic_files_df, use_container_width=True)
                         
                         # Add download option
-                        csv = pd.DataFrame(demographic_file_summaries).to_csv(index=False)
-                        b64 = base64.b64encode(csv.encode()).decode()
-                        href = f'data:file/csv;base64,{b64}'
-                        st.markdown(
-                            f'<a href="{href}" download="demographic_files_summary.csv"><button style="padding: 0.5em 1em; '
-                            f'background-color: #4CAF50; color: white; border: none; '
-                            f'border-radius: 4px; cursor: pointer;">Download Demographic Files Summary (CSV)</button></a>',
-                            unsafe_allow_html=True
+                        st.download_button(
+                            "Download Demographic Files Summary (CSV)",
+                            data=demographic_files_df.to_csv(index=False).encode(),
+                            file_name="demographic_files_summary.csv",
+                            mime="text/csv"
                         )
                         
                         # Show count by file type
                         st.subheader("Demographic Data by File Type")
-                        file_type_counts = pd.DataFrame(demographic_file_summaries)["File Type"].value_counts().reset_index()
+                        file_type_counts = demographic_files_df["File Type"].value_counts().reset_index()
                         file_type_counts.columns = ["File Type", "Count"]
                         st.dataframe(file_type_counts, use_container_width=True)
                     else:
@@ -1006,23 +1350,19 @@ def main():
                 search_term = st.text_input("Search for class:", "")
                 
                 if search_term:
-                    filtered_df = hierarchy_df[
-                        hierarchy_df["Source Class"].str.contains(search_term, case=False) | 
-                        hierarchy_df["Target Class"].str.contains(search_term, case=False)
-                    ]
+                    # One plain substring search over both class names, lowercased once per diagram
+                    search_keys = cached_hierarchy_search_keys(uml_key, hierarchy_df)
+                    filtered_df = hierarchy_df[search_keys.str.contains(search_term.lower(), regex=False)]
                     st.dataframe(filtered_df, use_container_width=True)
                 else:
                     st.dataframe(hierarchy_df, use_container_width=True)
                 
                 # Download option
-                csv = hierarchy_df.to_csv(index=False)
-                b64 = base64.b64encode(csv.encode()).decode()
-                href = f'data:file/csv;base64,{b64}'
-                st.markdown(
-                    f'<a href="{href}" download="class_hierarchy.csv"><button style="padding: 0.5em 1em; '
-                    f'background-color: #4CAF50; color: white; border: none; '
-                    f'border-radius: 4px; cursor: pointer;">Download Hierarchy Table (CSV)</button></a>',
-                    unsafe_allow_html=True
+                st.download_button(
+                    "Download Hierarchy Table (CSV)",
+                    data=cached_hierarchy_csv(uml_key, hierarchy_df),
+                    file_name="class_hierarchy.csv",
+                    mime="text/csv"
                 )
             else:
                 st.warning("No class relationships found in the diagram.")
@@ -1033,23 +1373,8 @@ def main():
             st.info("This section analyzes your code for quality, security, and performance issues.")
             
             if 'uploaded_code' in st.session_state and 'available_folders' in st.session_state:
-                # Create a code analyzer
-                analyzer = CodeAnalyzer()
-                
-                # Extract all Java files from the code for analysis
-                java_files = []
-                code_chunks = st.session_state.uploaded_code.split("# File: ")
-                
-                # Skip the first empty chunk
-                for chunk in code_chunks[1:]:
-                    lines = chunk.strip().split("\n", 1)
-                    if len(lines) >= 2:
-                        file_path = lines[0].strip()
-                        content = lines[1]
-                        java_files.append({
-                            "file_path": file_path,
-                            "content": content
-                        })
+                # All Java files of the upload, split once per upload
+                java_files = get_java_files()
                 
                 # Let user select a folder to analyze
                 folder_options = ["All Folders"] + st.session_state.available_folders
@@ -1060,20 +1385,15 @@ def main():
                 
                 if selected_analysis_folder == "All Folders":
                     # Analyze all files
-                    all_files_analysis = {}
-                    
-                    for file_info in java_files:
-                        file_result = analyzer.analyze_file(file_info["content"], file_info["file_path"])
-                        all_files_analysis[file_info["file_path"]] = file_result
+                    all_files_analysis = analyze_files(java_files)
                     
                     # Display a summary of results
                     total_files = len(all_files_analysis)
-                    total_code_smells = sum(sum(len(smells) for smells in result["code_smells"].values()) 
-                                         for result in all_files_analysis.values())
-                    total_security_issues = sum(sum(len(issues) for issues in result["security_issues"].values()) 
-                                             for result in all_files_analysis.values())
-                    total_performance_issues = sum(sum(len(issues) for issues in result["performance_issues"].values()) 
-                                                for result in all_files_analysis.values())
+                    total_code_smells = total_security_issues = total_performance_issues = 0
+                    for result in all_files_analysis.values():
+                        total_code_smells += result["metrics"]["code_smell_count"]
+                        total_security_issues += result["metrics"]["security_issue_count"]
+                        total_performance_issues += result["metrics"]["performance_issue_count"]
                     
                     # Display metrics
                     col1, col2, col3, col4 = st.columns(4)
@@ -1093,40 +1413,20 @@ def main():
                     with analysis_tabs[0]:
                         st.subheader("Code Smell Analysis")
                         
-                        code_smell_data = []
-                        for file_path, result in all_files_analysis.items():
-                            for smell_type, smells in result["code_smells"].items():
-                                for smell in smells:
-                                    if "name" in smell:  # Long methods and Too many parameters
-                                        code_smell_data.append({
-                                            "File": file_path,
-                                            "Type": smell_type.replace("_", " ").title(),
-                                            "Element": smell.get("name", ""),
-                                            "Details": f"{smell.get('lines', smell.get('parameter_count', ''))} (Threshold: {smell.get('threshold', '')})",
-                                            "Description": smell["description"]
-                                        })
-                                    else:  # Other code smells
-                                        code_smell_data.append({
-                                            "File": file_path,
-                                            "Type": smell_type.replace("_", " ").title(),
-                                            "Element": smell.get("match", ""),
-                                            "Details": "",
-                                            "Description": smell["description"]
-                                        })
+                        df = arrow_backed(pd.DataFrame.from_records(
+                            iter_code_smell_rows(all_files_analysis),
+                            columns=["File", "Type", "Element", "Details", "Description"]
+                        ))
                         
-                        if code_smell_data:
-                            df = pd.DataFrame(code_smell_data)
+                        if not df.empty:
                             st.dataframe(df, use_container_width=True)
                             
                             # Add download option
-                            csv = df.to_csv(index=False)
-                            b64 = base64.b64encode(csv.encode()).decode()
-                            href = f'data:file/csv;base64,{b64}'
-                            st.markdown(
-                                f'<a href="{href}" download="code_smells.csv"><button style="padding: 0.5em 1em; '
-                                f'background-color: #4CAF50; color: white; border: none; '
-                                f'border-radius: 4px; cursor: pointer;">Download Code Smells (CSV)</button></a>',
-                                unsafe_allow_html=True
+                            st.download_button(
+                                "Download Code Smells (CSV)",
+                                data=df.to_csv(index=False).encode(),
+                                file_name="code_smells.csv",
+                                mime="text/csv"
                             )
                         else:
                             st.success("No code smells detected.")
@@ -1134,30 +1434,17 @@ def main():
                     with analysis_tabs[1]:
                         st.subheader("Security Issue Analysis")
                         
-                        security_data = []
-                        for file_path, result in all_files_analysis.items():
-                            for issue_type, issues in result["security_issues"].items():
-                                for issue in issues:
-                                    security_data.append({
-                                        "File": file_path,
-                                        "Issue Type": issue_type.replace("_", " ").title(),
-                                        "Code": issue.get("match", ""),
-                                        "Description": issue["description"]
-                                    })
+                        df = analysis_issue_table(all_files_analysis, "security_issues", ["File", "Issue Type", "Code", "Description"])
                         
-                        if security_data:
-                            df = pd.DataFrame(security_data)
+                        if not df.empty:
                             st.dataframe(df, use_container_width=True)
                             
                             # Add download option
-                            csv = df.to_csv(index=False)
-                            b64 = base64.b64encode(csv.encode()).decode()
-                            href = f'data:file/csv;base64,{b64}'
-                            st.markdown(
-                                f'<a href="{href}" download="security_issues.csv"><button style="padding: 0.5em 1em; '
-                                f'background-color: #FF5252; color: white; border: none; '
-                                f'border-radius: 4px; cursor: pointer;">Download Security Issues (CSV)</button></a>',
-                                unsafe_allow_html=True
+                            st.download_button(
+                                "Download Security Issues (CSV)",
+                                data=df.to_csv(index=False).encode(),
+                                file_name="security_issues.csv",
+                                mime="text/csv"
                             )
                         else:
                             st.success("No security issues detected.")
@@ -1165,30 +1452,17 @@ def main():
                     with analysis_tabs[2]:
                         st.subheader("Performance Issue Analysis")
                         
-                        performance_data = []
-                        for file_path, result in all_files_analysis.items():
-                            for issue_type, issues in result["performance_issues"].items():
-                                for issue in issues:
-                                    performance_data.append({
-                                        "File": file_path,
-                                        "Issue Type": issue_type.replace("_", " ").title(),
-                                        "Code": issue.get("match", ""),
-                                        "Description": issue["description"]
-                                    })
+                        df = analysis_issue_table(all_files_analysis, "performance_issues", ["File", "Issue Type", "Code", "Description"])
                         
-                        if performance_data:
-                            df = pd.DataFrame(performance_data)
+                        if not df.empty:
                             st.dataframe(df, use_container_width=True)
                             
                             # Add download option
-                            csv = df.to_csv(index=False)
-                            b64 = base64.b64encode(csv.encode()).decode()
-                            href = f'data:file/csv;base64,{b64}'
-                            st.markdown(
-                                f'<a href="{href}" download="performance_issues.csv"><button style="padding: 0.5em 1em; '
-                                f'background-color: #FFC107; color: white; border: none; '
-                                f'border-radius: 4px; cursor: pointer;">Download Performance Issues (CSV)</button></a>',
-                                unsafe_allow_html=True
+                            st.download_button(
+                                "Download Performance Issues (CSV)",
+                                data=df.to_csv(index=False).encode(),
+                                file_name="performance_issues.csv",
+                                mime="text/csv"
                             )
                         else:
                             st.success("No performance issues detected.")
@@ -1196,30 +1470,17 @@ def main():
                     with analysis_tabs[3]:
                         st.subheader("Design Pattern Detection")
                         
-                        pattern_data = []
-                        for file_path, result in all_files_analysis.items():
-                            for pattern_type, patterns in result["design_patterns"].items():
-                                for pattern in patterns:
-                                    pattern_data.append({
-                                        "File": file_path,
-                                        "Pattern": pattern_type.replace("_", " ").title(),
-                                        "Code Fragment": pattern.get("match", ""),
-                                        "Description": pattern["description"]
-                                    })
+                        df = analysis_issue_table(all_files_analysis, "design_patterns", ["File", "Pattern", "Code Fragment", "Description"])
                         
-                        if pattern_data:
-                            df = pd.DataFrame(pattern_data)
+                        if not df.empty:
                             st.dataframe(df, use_container_width=True)
                             
                             # Add download option
-                            csv = df.to_csv(index=False)
-                            b64 = base64.b64encode(csv.encode()).decode()
-                            href = f'data:file/csv;base64,{b64}'
-                            st.markdown(
-                                f'<a href="{href}" download="design_patterns.csv"><button style="padding: 0.5em 1em; '
-                                f'background-color: #2196F3; color: white; border: none; '
-                                f'border-radius: 4px; cursor: pointer;">Download Design Patterns (CSV)</button></a>',
-                                unsafe_allow_html=True
+                            st.download_button(
+                                "Download Design Patterns (CSV)",
+                                data=df.to_csv(index=False).encode(),
+                                file_name="design_patterns.csv",
+                                mime="text/csv"
                             )
                         else:
                             st.warning("No design patterns detected.")
@@ -1257,32 +1518,25 @@ def main():
                     
                     file_results = folder_analysis["file_results"]
                     if file_results:
-                        file_data = []
-                        for result in file_results:
-                            file_data.append({
-                                "File": result["file_path"],
-                                "Lines": result["metrics"]["total_lines"],
-                                "Classes": result["metrics"]["class_count"],
-                                "Methods": result["metrics"]["method_count"],
-                                "Complexity Rating": result["complexity"]["complexity_rating"],
-                                "Cyclomatic Complexity": result["complexity"]["cyclomatic_complexity"],
-                                "Cognitive Complexity": result["complexity"]["cognitive_complexity"],
-                                "Code Smells": sum(len(smells) for smells in result["code_smells"].values()),
-                                "Security Issues": sum(len(issues) for issues in result["security_issues"].values()),
-                                "Performance Issues": sum(len(issues) for issues in result["performance_issues"].values())
-                            })
-                        
-                        df = pd.DataFrame(file_data)
+                        # Gather each column straight from the analysis results
+                        df = pd.DataFrame({
+                            "File": [result["file_path"] for result in file_results],
+                            "Lines": [result["metrics"]["total_lines"] for result in file_results],
+                            "Classes": [result["metrics"]["class_count"] for result in file_results],
+                            "Methods": [result["metrics"]["method_count"] for result in file_results],
+                            "Complexity Rating": [result["complexity"]["complexity_rating"] for result in file_results],
+                            "Cyclomatic Complexity": [result["complexity"]["cyclomatic_complexity"] for result in file_results],
+                            "Cognitive Complexity": [result["complexity"]["cognitive_complexity"] for result in file_results],
+                            "Code Smells": [result["metrics"]["code_smell_count"] for result in file_results],
+                            "Security Issues": [result["metrics"]["security_issue_count"] for result in file_results],
+                            "Performance Issues": [result["metrics"]["performance_issue_count"] for result in file_results]
+                        })
                         st.dataframe(df, use_container_width=True)
                     else:
                         st.warning(f"No Java files found in {selected_analysis_folder}")
             else:
                 st.warning("No code available for analysis. Please upload a ZIP file with Java code first.")
     
-    # Initialize session state for the UML diagram
-    if 'uml_diagram' not in st.session_state:
-        st.session_state.uml_diagram = UMLDiagram(classes=[], relationships=[])
-    
     # Fixed to Java language only
     language = "Java"
     st.info("JUML is configured to parse Java code files (.java)")
@@ -1297,8 +1551,13 @@ def main():
         # First scan the ZIP file to extract folder structure without processing files
         with st.spinner("Extracting folder structure from ZIP file..."):
             try:
-                # Do an initial scan to get folders (will set st.session_state.available_folders)
-                process_zip_file(uploaded_file, language)
+                # Open and scan each upload once, directly on the uploaded buffer; the scan only
+                # reads its directory, and the same handle is kept to extract the selected files
+                if st.session_state.get("last_zip_id") != uploaded_file.file_id:
+                    st.session_state.zip_file = zipfile.ZipFile(uploaded_file)
+                    st.session_state.available_folders = scan_zip_folders(st.session_state.zip_file)
+                    st.session_state.last_zip_id = uploaded_file.file_id
+                zip_file = st.session_state.zip_file
                 
                 # Now show a folder selection widget if folders were found
                 if 'available_folders' in st.session_state and st.session_state.available_folders:
@@ -1333,22 +1592,30 @@ def main():
         # Process the uploaded ZIP file
         with st.spinner(f"Processing ZIP file: {uploaded_file.name} with selected folders..."):
             try:
-                code = process_zip_file(uploaded_file, language, selected_folders)
+                # Extract again only for a new upload, language or folder selection
+                extract_key = (uploaded_file.file_id, language, tuple(selected_folders or ()))
+                if st.session_state.get("last_extract_key") == extract_key:
+                    code = st.session_state.uploaded_code
+                else:
+                    code = extract_zip_code(zip_file, language, selected_folders)
+                    st.session_state.last_extract_key = extract_key if code else None
                 if code:
                     # Save the code in session state for data analysis
                     st.session_state.uploaded_code = code
+                    st.session_state.code_hash = content_digest(code)
+                    preview_length = min(1000, len(code))
+                    st.session_state.uploaded_preview = code[:preview_length] + ("..." if len(code) > preview_length else "")
                     
                     # Preview of extracted code
                     with st.expander("Preview of extracted code"):
-                        preview_length = min(1000, len(code))
-                        st.code(code[:preview_length] + ("..." if len(code) > preview_length else ""))
+                        st.code(st.session_state.uploaded_preview)
                     
                     # Automatically generate diagram
                     try:
-                        parser = get_parser(language)
+                        parser = cached_parser(language)
                         if parser:
-                            uml_diagram = parser.parse(code)
-                            st.session_state.uml_diagram = uml_diagram
+                            uml_diagram = parse_code(st.session_state.code_hash, code, language)
+                            set_uml_diagram(uml_diagram)
                             st.success(f"Successfully parsed {language} code and generated diagram!")
                         else:
                             st.error(f"Parser for {language} not available.")
@@ -1365,110 +1632,7 @@ def main():
     # Display diagram section
     st.header("UML Class Diagram")
     
-    if st.session_state.uml_diagram and st.session_state.uml_diagram.classes:
-        # Display diagram info
-        class_count = len(st.session_state.uml_diagram.classes)
-        relationship_count = len(st.session_state.uml_diagram.relationships)
-        st.info(f"Diagram contains {class_count} classes and {relationship_count} relationships")
-        
-        # Display diagram
-        try:
-            # Validate diagram data before generating
-            if not st.session_state.uml_diagram.classes:
-                st.warning("The diagram doesn't contain any classes. Make sure the uploaded ZIP file has valid Java code.")
-                return
-                
-            # Select diagram type
-            diagram_type = st.radio("Diagram Type", ["Class Diagram", "Package Diagram", "Hierarchy Explorer"], horizontal=True)
-            
-            # Generate diagram with enhanced error handling
-            try:
-                if diagram_type == "Class Diagram":
-                    st.subheader("Class Diagram")
-                    
-                    # Get list of packages to filter by
-                    packages = ["All Packages"]
-                    for cls in st.session_state.uml_diagram.classes:
-                        if cls.package and cls.package not in packages:
-                            packages.append(cls.package)
-                    
-                    # Package filter dropdown
-                    selected_package = st.selectbox("Filter by Package", packages, key="package_filter")
-                    
-                    # Apply package filter or show all classes
-                    if selected_package == "All Packages":
-                        svg_content = generator.generate_svg(st.session_state.uml_diagram)
-                    else:
-                        svg_content = generator.generate_svg(st.session_state.uml_diagram, selected_package)
-                    
-                    st.markdown(f'<div style="overflow: auto;">{svg_content}</div>', unsafe_allow_html=True)
-                    
-                    # Download options
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        download_format = st.selectbox("Download Format", ["SVG", "PNG"], key="class_download_format")
-                    
-                    with col2:
-                        # Pass selected package to download link generation
-                        if selected_package == "All Packages":
-                            href, ext = get_download_link(st.session_state.uml_diagram, download_format.lower(), "class")
-                        else:
-                            href, ext = get_download_link(st.session_state.uml_diagram, download_format.lower(), "class", selected_package)
-                            
-                        st.markdown(
-                            f'<a href="{href}" download="class_diagram.{ext}"><button style="padding: 0.5em 1em; '
-                            f'background-color: #4CAF50; color: white; border: none; '
-                            f'border-radius: 4px; cursor: pointer;">Download Class Diagram</button></a>',
-                            unsafe_allow_html=True
-                        )
-                elif diagram_type == "Package Diagram":
-                    st.subheader("Package Diagram")
-                    svg_content = generator.generate_package_svg(st.session_state.uml_diagram)
-                    st.markdown(f'<div style="overflow: auto;">{svg_content}</div>', unsafe_allow_html=True)
-                    
-                    # Download options
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        download_format = st.selectbox("Download Format", ["SVG", "PNG"], key="package_download_format")
-                    
-                    with col2:
-                        href, ext = get_download_link(st.session_state.uml_diagram, download_format.lower(), "package")
-                        st.markdown(
-                            f'<a href="{href}" download="package_diagram.{ext}"><button style="padding: 0.5em 1em; '
-                            f'background-color: #4CAF50; color: white; border: none; '
-                            f'border-radius: 4px; cursor: pointer;">Download Package Diagram</button></a>',
-                            unsafe_allow_html=True
-                        )
-                else:  # Hierarchy Explorer
-                    st.subheader("Interactive Class Hierarchy Explorer")
-                    
-                    # Get list of packages to filter by
-                    packages = ["All Packages"]
-                    for cls in st.session_state.uml_diagram.classes:
-                        if cls.package and cls.package not in packages:
-                            packages.append(cls.package)
-                    
-                    # Package filter dropdown
-                    selected_package = st.selectbox("Filter by Package", packages, key="hierarchy_package_filter")
-                    
-                    # Apply the package filter to the hierarchy explorer
-                    create_hierarchy_explorer(st.session_state.uml_diagram, selected_package)
-                
-                # Clear diagram button
-                if st.button("Clear Diagram"):
-                    st.session_state.uml_diagram = UMLDiagram(classes=[], relationships=[])
-                    st.session_state.classes = []
-                    st.session_state.current_relationships = []
-                    st.rerun()
-            except Exception as e:
-                st.error(f"Error rendering diagram: {str(e)}")
-                st.info("Try uploading a different ZIP file with Java code.")
-                
-        except Exception as e:
-            st.error(f"Error generating diagram: {str(e)}")
-            st.info("There might be an issue with the diagram generation. Please try uploading a different Java code ZIP file.")
-    else:
-        st.info("No diagram to display. Please upload a ZIP file to generate a diagram.")
+    render_diagram_section()
 
 
 if __name__ == "__main__":
@@ -2,11 +2,259 @@
 Code Analyzer for Java Code
 This module provides functions to analyze Java code without requiring external ML models.
 """
+import hashlib
 import re
 import os
-from typing import Dict, List, Any, Set, Optional
+import threading
+from collections import Counter, OrderedDict
+from functools import reduce
+from operator import itemgetter, or_
+from typing import Dict, List, Any, Set, Optional, Tuple
 import json
 
+from utils.parallel import process_map
+
+# Analysis results of recently seen files, keyed on a digest of their content
+ANALYZED_FILE_CACHE_SIZE = 4096
+_analyzed_files = OrderedDict()
+_analyzed_files_lock = threading.Lock()
+
+# Patterns for the per-file metrics and complexity estimate
+CLASS_PATTERN = re.compile(r'class\s+\w+')
+INTERFACE_PATTERN = re.compile(r'interface\s+\w+')
+METHOD_PATTERN = re.compile(r'(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\([^)]*\)')
+
+# Branching keywords: "if (", "else", "for (", "while (", "case " and "catch (". The
+# matches can't overlap, so one scan gives every keyword's count (from whichever
+# group matched).
+BRANCH_PATTERN = re.compile(r'\b(?:(if|for|while|catch)\s*\(|(else)\b|(case)\s+)')
+
+# Whitespace-only lines, and lines starting with a comment
+BLANK_LINE_PATTERN = re.compile(r'^[^\S\n]*$', re.MULTILINE)
+COMMENT_LINE_PATTERN = re.compile(r'^[^\S\n]*(?://|/\*)', re.MULTILINE)
+
+# Lines starting with a closing brace (after the first line) and lines ending with an
+# opening brace; kept as two patterns so each scan can jump straight to its literal
+BLOCK_CLOSE_PATTERN = re.compile(r'\n[^\S\n]*\}')
+FIRST_LINE_CLOSE_PATTERN = re.compile(r'[^\S\n]*\}')
+BLOCK_OPEN_PATTERN = re.compile(r'\{[^\S\n]*$', re.MULTILINE)
+
+# The first non-whitespace character from a position on
+NEXT_TOKEN_PATTERN = re.compile(r'\s*(\S)')
+
+# Braces, plus the string literals and comments whose braces must not be counted
+BLOCK_TOKEN_PATTERN = re.compile(r'[{}]|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+
+def find_block_end(code: str, pos: int) -> int:
+    """
+    Find the end of the block whose opening brace ends just before pos
+
+    Returns:
+        The index just past the matching closing brace, or -1 if the block is never closed
+    """
+    depth = 1
+    for token in BLOCK_TOKEN_PATTERN.finditer(code, pos):
+        brace = token.group(0)
+        if brace == '{':
+            depth += 1
+        elif brace == '}':
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return -1
+
+
+def iter_step_matches(steps: List[re.Pattern], pattern: re.Pattern, code: str):
+    """
+    Yield the (start, end) span of each match of a rule whose steps are joined by '.*?'
+
+    The joined pattern retries every start position up to the end of the code when a
+    later step is missing, which is quadratic on files full of first-step hits. Each
+    search is therefore gated on a cheap check: every step must have a match starting
+    at or after where the previous step's leftmost match starts. Any match of the
+    joined pattern has its steps in that order, so when the check fails no match
+    remains and the scan stops. The matches themselves come from the joined pattern.
+    """
+    pos = 0
+    while True:
+        start = pos
+        for step in steps:
+            step_match = step.search(code, start)
+            if not step_match:
+                return
+            start = step_match.start()
+        match = pattern.search(code, pos)
+        if not match:
+            return
+        yield match.span()
+        pos = match.end()
+
+
+# Common code quality issues to look for
+CODE_SMELLS = {
+    "long_method": {
+        # Method header up to its opening brace; the body is measured by find_block_end
+        "pattern": r"(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\([^)]*\)\s*(?:throws\s+[\w,\s]+)?{",
+        "literals": ("public", "private", "protected"),
+        "threshold": 30,  # lines
+        "description": "Methods with too many lines may be doing too much and should be refactored."
+    },
+    "too_many_parameters": {
+        "pattern": r"(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\(([^)]*)\)",
+        "literals": ("public", "private", "protected"),
+        "threshold": 5,  # parameters
+        "description": "Methods with too many parameters are hard to use and understand."
+    },
+    "catch_exception": {
+        "pattern": r"catch\s*\(\s*Exception\s+\w+\s*\)",
+        "literals": ("catch",),
+        "description": "Catching generic exceptions is usually bad practice."
+    },
+    "public_fields": {
+        "pattern": r"public\s+(?:static\s+)?(?:final\s+)?(?!class|interface|enum)(\w+)\s+(\w+)",
+        "literals": ("public",),
+        "description": "Public fields violate encapsulation. Consider using getters/setters."
+    },
+    "magic_numbers": {
+        "pattern": r"(?:=|return|[,(+\-*/])\s*(-?\d+(?:\.\d+)?)\s*(?:[;,)]|$)",
+        "exclude": r"(?:0|1|-1|100)",  # Common acceptable "magic" numbers
+        "description": "Magic numbers should be replaced with named constants."
+    },
+    "todo_comments": {
+        "pattern": r"//\s*TODO|/\*\s*TODO",
+        "literals": ("TODO",),
+        "description": "TODO comments indicate incomplete code that needs attention."
+    },
+    "empty_catch": {
+        "pattern": r"catch\s*\([^)]+\)\s*{\s*}",
+        "literals": ("catch",),
+        "description": "Empty catch blocks suppress exceptions without handling them."
+    },
+    "complex_conditional": {
+        "pattern": r"if\s*\([^{]+(&&|\|\|)[^{]+(&&|\|\|)",
+        "literals": ("&&", "||"),
+        "description": "Complex conditionals can be difficult to understand. Consider simplifying."
+    }
+}
+
+# Security issues to look for
+SECURITY_ISSUES = {
+    "sql_injection": {
+        "pattern": r'(?:executeQuery|executeUpdate|execute|prepareStatement)\s*\(\s*"[^"]*\+',
+        "literals": ("execute", "prepareStatement"),
+        "description": "Potential SQL injection vulnerability. Use prepared statements with parameters."
+    },
+    "hardcoded_credentials": {
+        "pattern": r'(?:password|pwd|passwd|secret|key)\s*=\s*"[^"]{3,}"',
+        "literals": ("password", "pwd", "passwd", "secret", "key"),
+        "description": "Hardcoded credentials are a security risk. Use secure configuration methods."
+    },
+    "insecure_randoms": {
+        "pattern": r'new\s+Random\s*\(',
+        "literals": ("Random",),
+        "description": "java.util.Random is not cryptographically secure. Use SecureRandom for security purposes."
+    },
+    "xxe_vulnerability": {
+        "pattern": r'(?:DocumentBuilderFactory|SAXParserFactory|XMLInputFactory)',
+        "literals": ("Factory",),
+        "description": "Potential XXE vulnerability. Enable secure processing and disable external entities."
+    },
+    "log_injection": {
+        "pattern": r'log(?:ger)?\.(?:debug|info|warning|error|severe)\s*\([^)]*\+\s*(?:\w+)',
+        "literals": ("log",),
+        "description": "Potential log injection. Sanitize user input before logging."
+    }
+}
+
+# Performance issues
+PERFORMANCE_ISSUES = {
+    "string_concatenation_in_loop": {
+        "pattern": r'for\s*\([^{]+\{(?:[^;]*+;)*\s*\w+\s*\+=\s*"[^"]*"',
+        "literals": ("+=",),
+        "description": "String concatenation in loops is inefficient. Use StringBuilder instead."
+    },
+    "instantiation_in_loop": {
+        "pattern": r'for\s*\([^{]+\{(?:[^;]*+;)*\s*new\s+\w+',
+        "literals": ("new",),
+        "description": "Object instantiation inside loops can be inefficient. Consider moving outside the loop."
+    },
+    "inefficient_string_conversion": {
+        "pattern": r'new\s+String\s*\(\s*(""|[^)]+\.toString\(\))',
+        "literals": ("String",),
+        "description": "Inefficient string conversion. Use the string directly or the toString() result."
+    }
+}
+
+# Design patterns to detect; "steps" are patterns that must follow one another
+# in order, with anything in between
+DESIGN_PATTERNS = {
+    "singleton": {
+        "steps": [r'private\s+static\s+\w+\s+\w+Instance', r'private\s+\w+\s*\(', r'public\s+static\s+\w+\s+getInstance'],
+        "literals": ("getInstance",),
+        "description": "Singleton pattern: A class with a single instance that provides global access."
+    },
+    "factory_method": {
+        "pattern": r'(?:public|protected)\s+\w+\s+create\w+\s*\([^)]*\)',
+        "literals": ("create",),
+        "description": "Factory Method pattern: Creates objects without specifying the exact class to create."
+    },
+    "observer": {
+        "pattern": r'(?:implements|extends)\s+(?:\w+\.)*(?:Observer|Listener)',
+        "literals": ("Observer", "Listener"),
+        "description": "Observer pattern: Defines one-to-many dependency between objects."
+    },
+    "builder": {
+        "steps": [r'class\s+\w+Builder', r'public\s+\w+\s+build\s*\('],
+        "literals": ("Builder",),
+        "description": "Builder pattern: Separates object construction from its representation."
+    },
+    "decorator": {
+        "steps": [r'class\s+\w+(?:Decorator|Wrapper)', r'implements\s+\w+', r'private\s+\w+\s+wrapped'],
+        "literals": ("wrapped",),
+        "description": "Decorator pattern: Attaches additional responsibilities to objects dynamically."
+    }
+}
+
+# Characters that Unicode \s matches but ASCII \s doesn't, besides non-ASCII ones
+UNICODE_ONLY_SPACE_PATTERN = re.compile(r'[\x1c-\x1f]')
+
+
+def _compile_rules():
+    r"""
+    Compile every rule pattern once per process; the detectors only use the compiled forms
+
+    Each pattern is also compiled with re.ASCII, which skips the Unicode character
+    tables for \w, \s and \b. On plain ASCII code both forms match the same text.
+    """
+    for rules in (CODE_SMELLS, SECURITY_ISSUES, PERFORMANCE_ISSUES):
+        for info in rules.values():
+            info["regex"] = re.compile(info["pattern"])
+            info["ascii_regex"] = re.compile(info["pattern"], re.ASCII)
+            if "exclude" in info:
+                info["exclude_regex"] = re.compile(info["exclude"])
+    for info in DESIGN_PATTERNS.values():
+        if "steps" in info:
+            info["step_regexes"] = [re.compile(step) for step in info["steps"]]
+            info["ascii_step_regexes"] = [re.compile(step, re.ASCII) for step in info["steps"]]
+            info["regex"] = re.compile(".*?".join(info["steps"]), re.DOTALL)
+            info["ascii_regex"] = re.compile(".*?".join(info["steps"]), re.DOTALL | re.ASCII)
+        else:
+            info["regex"] = re.compile(info["pattern"], re.DOTALL)
+            info["ascii_regex"] = re.compile(info["pattern"], re.DOTALL | re.ASCII)
+
+
+def is_plain_ascii(code: str) -> bool:
+    """Whether the ASCII-only rule patterns match the code exactly like the Unicode ones"""
+    return code.isascii() and not UNICODE_ONLY_SPACE_PATTERN.search(code)
+
+
+_compile_rules()
+
+# One bit per design pattern, so the patterns found in many files merge with |
+DESIGN_PATTERN_BITS = {name: 1 << index for index, name in enumerate(DESIGN_PATTERNS)}
+
+
 class CodeAnalyzer:
     """
     A class to analyze Java code for various metrics and patterns.
@@ -14,108 +262,35 @@ class CodeAnalyzer:
     """
     
     def __init__(self):
-        # Common code quality issues to look for
-        self.code_smells = {
-            "long_method": {
-                "pattern": r"(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\([^)]*\)\s*(?:throws\s+[\w,\s]+\s*)?{(?:[^{}]|{[^{}]*})*}",
-                "threshold": 30,  # lines
-                "description": "Methods with too many lines may be doing too much and should be refactored."
-            },
-            "too_many_parameters": {
-                "pattern": r"(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\(([^)]*)\)",
-                "threshold": 5,  # parameters
-                "description": "Methods with too many parameters are hard to use and understand."
-            },
-            "catch_exception": {
-                "pattern": r"catch\s*\(\s*Exception\s+\w+\s*\)",
-                "description": "Catching generic exceptions is usually bad practice."
-            },
-            "public_fields": {
-                "pattern": r"public\s+(?:static\s+)?(?:final\s+)?(?!class|interface|enum)(\w+)\s+(\w+)",
-                "description": "Public fields violate encapsulation. Consider using getters/setters."
-            },
-            "magic_numbers": {
-                "pattern": r"(?:=|return|[,(+\-*/])\s*(-?\d+(?:\.\d+)?)\s*(?:[;,)]|$)",
-                "exclude": r"(?:0|1|-1|100)",  # Common acceptable "magic" numbers
-                "description": "Magic numbers should be replaced with named constants."
-            },
-            "todo_comments": {
-                "pattern": r"//\s*TODO|/\*\s*TODO",
-                "description": "TODO comments indicate incomplete code that needs attention."
-            },
-            "empty_catch": {
-                "pattern": r"catch\s*\([^)]+\)\s*{\s*}",
-                "description": "Empty catch blocks suppress exceptions without handling them."
-            },
-            "complex_conditional": {
-                "pattern": r"if\s*\([^{]+(&&|\|\|)[^{]+(&&|\|\|)",
-                "description": "Complex conditionals can be difficult to understand. Consider simplifying."
-            }
-        }
-        
-        # Security issues to look for
-        self.security_issues = {
-            "sql_injection": {
-                "pattern": r'(?:executeQuery|executeUpdate|execute|prepareStatement)\s*\(\s*"[^"]*\+',
-                "description": "Potential SQL injection vulnerability. Use prepared statements with parameters."
-            },
-            "hardcoded_credentials": {
-                "pattern": r'(?:password|pwd|passwd|secret|key)\s*=\s*"[^"]{3,}"',
-                "description": "Hardcoded credentials are a security risk. Use secure configuration methods."
-            },
-            "insecure_randoms": {
-                "pattern": r'new\s+Random\s*\(',
-                "description": "java.util.Random is not cryptographically secure. Use SecureRandom for security purposes."
-            },
-            "xxe_vulnerability": {
-                "pattern": r'(?:DocumentBuilderFactory|SAXParserFactory|XMLInputFactory)',
-                "description": "Potential XXE vulnerability. Enable secure processing and disable external entities."
-            },
-            "log_injection": {
-                "pattern": r'log(?:ger)?\.(?:debug|info|warning|error|severe)\s*\([^)]*\+\s*(?:\w+)',
-                "description": "Potential log injection. Sanitize user input before logging."
-            }
-        }
-        
-        # Performance issues
-        self.performance_issues = {
-            "string_concatenation_in_loop": {
-                "pattern": r'for\s*\([^{]+\{\s*(?:[^;]*;\s*)*\w+\s*\+=\s*"[^"]*"',
-                "description": "String concatenation in loops is inefficient. Use StringBuilder instead."
-            },
-            "instantiation_in_loop": {
-                "pattern": r'for\s*\([^{]+\{\s*(?:[^;]*;\s*)*new\s+\w+',
-                "description": "Object instantiation inside loops can be inefficient. Consider moving outside the loop."
-            },
-            "inefficient_string_conversion": {
-                "pattern": r'new\s+String\s*\(\s*(""|[^)]+\.toString\(\))',
-                "description": "Inefficient string conversion. Use the string directly or the toString() result."
-            }
-        }
-        
-        # Design patterns to detect
-        self.design_patterns = {
-            "singleton": {
-                "pattern": r'private\s+static\s+\w+\s+\w+Instance.*?private\s+\w+\s*\(.*?public\s+static\s+\w+\s+getInstance',
-                "description": "Singleton pattern: A class with a single instance that provides global access."
-            },
-            "factory_method": {
-                "pattern": r'(?:public|protected)\s+\w+\s+create\w+\s*\([^)]*\)',
-                "description": "Factory Method pattern: Creates objects without specifying the exact class to create."
-            },
-            "observer": {
-                "pattern": r'(?:implements|extends)\s+(?:\w+\.)*(?:Observer|Listener)',
-                "description": "Observer pattern: Defines one-to-many dependency between objects."
-            },
-            "builder": {
-                "pattern": r'class\s+\w+Builder.*?public\s+\w+\s+build\s*\(',
-                "description": "Builder pattern: Separates object construction from its representation."
-            },
-            "decorator": {
-                "pattern": r'class\s+\w+(?:Decorator|Wrapper).*?implements\s+\w+.*?private\s+\w+\s+wrapped',
-                "description": "Decorator pattern: Attaches additional responsibilities to objects dynamically."
-            }
-        }
+        # The rule tables are built and compiled once at import and shared by all analyzers
+        self.code_smells = CODE_SMELLS
+        self.security_issues = SECURITY_ISSUES
+        self.performance_issues = PERFORMANCE_ISSUES
+        self.design_patterns = DESIGN_PATTERNS
+        self.design_pattern_bits = DESIGN_PATTERN_BITS
+    
+    @staticmethod
+    def _may_match(rule: Dict[str, Any], code: str) -> bool:
+        """
+        Whether a rule can match the code at all
+
+        Every match of a rule contains one of its literals, so a rule whose literals
+        are all absent is skipped with plain substring searches, far cheaper than a
+        regex scan. Rules without literals are always scanned.
+        """
+        literals = rule.get("literals")
+        return literals is None or any(literal in code for literal in literals)
+    
+    @classmethod
+    def _find_matches(cls, rule: Dict[str, Any], code: str, ascii_only: bool = False):
+        """Iterate over the (start, end) spans of a rule's matches in the code"""
+        if not cls._may_match(rule, code):
+            return iter(())
+        if "step_regexes" in rule:
+            if ascii_only:
+                return iter_step_matches(rule["ascii_step_regexes"], rule["ascii_regex"], code)
+            return iter_step_matches(rule["step_regexes"], rule["regex"], code)
+        return (match.span() for match in rule["ascii_regex" if ascii_only else "regex"].finditer(code))
     
     def analyze_file(self, file_content: str, file_path: str) -> Dict[str, Any]:
         """
@@ -128,22 +303,38 @@ class CodeAnalyzer:
         Returns:
             A dictionary containing analysis results
         """
+        # Most Java sources are plain ASCII, which the faster ASCII-only patterns handle
+        ascii_only = is_plain_ascii(file_content)
+        
         results = {
             "file_path": file_path,
             "metrics": self._calculate_metrics(file_content),
-            "code_smells": self._detect_code_smells(file_content),
-            "security_issues": self._detect_security_issues(file_content),
-            "performance_issues": self._detect_performance_issues(file_content),
-            "design_patterns": self._detect_design_patterns(file_content),
+            "code_smells": self._detect_code_smells(file_content, ascii_only),
+            "security_issues": self._detect_security_issues(file_content, ascii_only),
+            "performance_issues": self._detect_performance_issues(file_content, ascii_only),
+            "design_patterns": self._detect_design_patterns(file_content, ascii_only),
             "complexity": self._estimate_complexity(file_content)
         }
         
+        # Issue totals, counted once here for the summaries and tables
+        metrics = results["metrics"]
+        metrics["code_smell_count"] = sum(len(occurrences) for occurrences in results["code_smells"].values())
+        metrics["security_issue_count"] = sum(len(occurrences) for occurrences in results["security_issues"].values())
+        metrics["performance_issue_count"] = sum(len(occurrences) for occurrences in results["performance_issues"].values())
+        metrics["design_pattern_mask"] = sum(
+            self.design_pattern_bits[pattern]
+            for pattern, occurrences in results["design_patterns"].items()
+            if occurrences
+        )
+        
         return results
     
     def analyze_folder(self, folder_path: str, java_files: List[Dict]) -> Dict[str, Any]:
         """
         Analyze all Java files in a folder
         
+        Files are analyzed independently, in worker processes for large folders.
+        
         Args:
             folder_path: Path to the folder
             java_files: List of dictionaries containing file paths and contents
@@ -151,49 +342,38 @@ class CodeAnalyzer:
         Returns:
             A dictionary containing aggregated analysis results
         """
-        all_results = []
+        # Process each file
+        folder_files = [
+            (file_info["file_path"], file_info["content"])
+            for file_info in java_files
+            if file_info["file_path"].startswith(folder_path)
+        ]
+        all_results = analyze_file_items(folder_files)
+        
+        # Aggregate metrics, one C-level sum per total
+        file_metrics = [file_result["metrics"] for file_result in all_results]
         all_metrics = {
-            "total_files": 0,
-            "total_lines": 0,
-            "total_classes": 0,
-            "total_methods": 0,
-            "avg_complexity": 0,
-            "total_code_smells": 0,
-            "total_security_issues": 0,
-            "total_performance_issues": 0,
-            "detected_design_patterns": set()
+            "total_files": len(all_results),
+            "total_lines": sum(map(itemgetter("total_lines"), file_metrics)),
+            "total_classes": sum(map(itemgetter("class_count"), file_metrics)),
+            "total_methods": sum(map(itemgetter("method_count"), file_metrics)),
+            "avg_complexity": sum(file_result["complexity"]["cyclomatic_complexity"] for file_result in all_results),
+            "total_code_smells": sum(map(itemgetter("code_smell_count"), file_metrics)),
+            "total_security_issues": sum(map(itemgetter("security_issue_count"), file_metrics)),
+            "total_performance_issues": sum(map(itemgetter("performance_issue_count"), file_metrics))
         }
         
-        # Process each file
-        for file_info in java_files:
-            if file_info["file_path"].startswith(folder_path):
-                file_content = file_info["content"]
-                file_result = self.analyze_file(file_content, file_info["file_path"])
-                all_results.append(file_result)
-                
-                # Aggregate metrics
-                all_metrics["total_files"] += 1
-                all_metrics["total_lines"] += file_result["metrics"]["total_lines"]
-                all_metrics["total_classes"] += file_result["metrics"]["class_count"]
-                all_metrics["total_methods"] += file_result["metrics"]["method_count"]
-                all_metrics["avg_complexity"] += file_result["complexity"]["cyclomatic_complexity"]
-                all_metrics["total_code_smells"] += sum(len(occurrences) for occurrences in file_result["code_smells"].values())
-                all_metrics["total_security_issues"] += sum(len(occurrences) for occurrences in file_result["security_issues"].values())
-                all_metrics["total_performance_issues"] += sum(len(occurrences) for occurrences in file_result["performance_issues"].values())
-                
-                # Add detected design patterns
-                for pattern, occurrences in file_result["design_patterns"].items():
-                    if occurrences:
-                        all_metrics["detected_design_patterns"].add(pattern)
+        # Design patterns detected in any file
+        pattern_mask = reduce(or_, map(itemgetter("design_pattern_mask"), file_metrics), 0)
+        all_metrics["detected_design_patterns"] = [
+            pattern for pattern, bit in self.design_pattern_bits.items() if pattern_mask & bit
+        ]
         
         # Calculate averages
         if all_metrics["total_files"] > 0:
             all_metrics["avg_complexity"] /= all_metrics["total_files"]
             all_metrics["code_smell_density"] = all_metrics["total_code_smells"] / all_metrics["total_lines"] if all_metrics["total_lines"] > 0 else 0
         
-        # Convert set to list for JSON serialization
-        all_metrics["detected_design_patterns"] = list(all_metrics["detected_design_patterns"])
-        
         return {
             "folder_path": folder_path,
             "metrics": all_metrics,
@@ -202,19 +382,17 @@ class CodeAnalyzer:
     
     def _calculate_metrics(self, code: str) -> Dict[str, int]:
         """Calculate basic metrics for a Java file"""
-        lines = code.split('\n')
-        
-        # Count lines
-        total_lines = len(lines)
-        code_lines = sum(1 for line in lines if line.strip() and not line.strip().startswith('//') and not line.strip().startswith('/*'))
-        comment_lines = sum(1 for line in lines if line.strip().startswith('//') or line.strip().startswith('/*'))
+        # Count lines; every line is blank, a comment or code
+        total_lines = code.count('\n') + 1
+        comment_lines = len(COMMENT_LINE_PATTERN.findall(code))
+        code_lines = total_lines - comment_lines - len(BLANK_LINE_PATTERN.findall(code))
         
         # Count classes and interfaces
-        class_count = len(re.findall(r'class\s+\w+', code))
-        interface_count = len(re.findall(r'interface\s+\w+', code))
+        class_count = len(CLASS_PATTERN.findall(code))
+        interface_count = len(INTERFACE_PATTERN.findall(code))
         
         # Count methods
-        method_count = len(re.findall(r'(?:public|private|protected)\s+(?:static\s+)?(?:\w+)\s+(\w+)\s*\([^)]*\)', code))
+        method_count = len(METHOD_PATTERN.findall(code))
         
         return {
             "total_lines": total_lines,
@@ -225,22 +403,32 @@ class CodeAnalyzer:
             "method_count": method_count
         }
     
-    def _detect_code_smells(self, code: str) -> Dict[str, List[Dict]]:
+    def _detect_code_smells(self, code: str, ascii_only: bool = False) -> Dict[str, List[Dict]]:
         """Detect code smells in Java code"""
         results = {}
         
         for smell_name, smell_info in self.code_smells.items():
-            pattern = smell_info["pattern"]
+            if not self._may_match(smell_info, code):
+                results[smell_name] = []
+                continue
+            
+            pattern = smell_info["ascii_regex" if ascii_only else "regex"]
             
             if smell_name == "long_method":
-                # Special handling for long methods
-                matches = re.finditer(pattern, code)
+                # Special handling for long methods: find each method header, then walk
+                # its body counting braces (a single linear pass, skipping strings and comments)
                 results[smell_name] = []
+                match = pattern.search(code)
                 
-                for match in matches:
-                    method_body = match.group(0)
+                while match:
+                    body_end = find_block_end(code, match.end())
+                    if body_end == -1:
+                        # Unclosed body; try the next header
+                        match = pattern.search(code, match.start() + 1)
+                        continue
+                    
                     method_name = match.group(1)
-                    line_count = method_body.count('\n')
+                    line_count = code.count('\n', match.start(), body_end)
                     
                     if line_count > smell_info["threshold"]:
                         results[smell_name].append({
@@ -249,10 +437,13 @@ class CodeAnalyzer:
                             "threshold": smell_info["threshold"],
                             "description": smell_info["description"]
                         })
+                    
+                    # Methods nested in this one (e.g. in anonymous classes) are part of its body
+                    match = pattern.search(code, body_end)
             
             elif smell_name == "too_many_parameters":
                 # Special handling for methods with too many parameters
-                matches = re.finditer(pattern, code)
+                matches = pattern.finditer(code)
                 results[smell_name] = []
                 
                 for match in matches:
@@ -274,14 +465,14 @@ class CodeAnalyzer:
             
             elif smell_name == "magic_numbers":
                 # Special handling for magic numbers
-                matches = re.finditer(pattern, code)
+                matches = pattern.finditer(code)
                 results[smell_name] = []
-                exclude_pattern = smell_info.get("exclude", r"$^")  # Never match by default
+                exclude_pattern = smell_info.get("exclude_regex")
                 
                 for match in matches:
                     number = match.group(1)
                     # Skip excluded numbers
-                    if not re.match(exclude_pattern, number):
+                    if exclude_pattern is None or not exclude_pattern.match(number):
                         results[smell_name].append({
                             "number": number,
                             "description": smell_info["description"]
@@ -289,69 +480,35 @@ class CodeAnalyzer:
             
             else:
                 # General handling for other code smells
-                matches = re.finditer(pattern, code)
-                results[smell_name] = []
-                
-                for match in matches:
-                    results[smell_name].append({
-                        "match": match.group(0)[:50] + "..." if len(match.group(0)) > 50 else match.group(0),
-                        "description": smell_info["description"]
-                    })
+                results[smell_name] = self._rule_findings(smell_info, code, ascii_only)
         
         return results
     
-    def _detect_security_issues(self, code: str) -> Dict[str, List[Dict]]:
+    @classmethod
+    def _rule_findings(cls, rule: Dict[str, Any], code: str, ascii_only: bool = False) -> List[Dict]:
+        """Findings of a rule: each match, shortened for display, with the rule's description"""
+        description = rule["description"]
+        # Slice the shortened match straight from the code rather than copying the whole match first
+        return [
+            {"match": code[start:start + 50] + "..." if end - start > 50 else code[start:end], "description": description}
+            for start, end in cls._find_matches(rule, code, ascii_only)
+        ]
+    
+    def _detect_security_issues(self, code: str, ascii_only: bool = False) -> Dict[str, List[Dict]]:
         """Detect security issues in Java code"""
-        results = {}
-        
-        for issue_name, issue_info in self.security_issues.items():
-            pattern = issue_info["pattern"]
-            
-            matches = re.finditer(pattern, code)
-            results[issue_name] = []
-            
-            for match in matches:
-                results[issue_name].append({
-                    "match": match.group(0)[:50] + "..." if len(match.group(0)) > 50 else match.group(0),
-                    "description": issue_info["description"]
-                })
-        
-        return results
+        return {issue_name: self._rule_findings(issue_info, code, ascii_only) for issue_name, issue_info in self.security_issues.items()}
     
-    def _detect_performance_issues(self, code: str) -> Dict[str, List[Dict]]:
+    def _detect_performance_issues(self, code: str, ascii_only: bool = False) -> Dict[str, List[Dict]]:
         """Detect performance issues in Java code"""
-        results = {}
-        
-        for issue_name, issue_info in self.performance_issues.items():
-            pattern = issue_info["pattern"]
-            
-            matches = re.finditer(pattern, code)
-            results[issue_name] = []
-            
-            for match in matches:
-                results[issue_name].append({
-                    "match": match.group(0)[:50] + "..." if len(match.group(0)) > 50 else match.group(0),
-                    "description": issue_info["description"]
-                })
-        
-        return results
+        return {issue_name: self._rule_findings(issue_info, code, ascii_only) for issue_name, issue_info in self.performance_issues.items()}
     
-    def _detect_design_patterns(self, code: str) -> Dict[str, List[Dict]]:
+    def _detect_design_patterns(self, code: str, ascii_only: bool = False) -> Dict[str, List[Dict]]:
         """Detect design patterns in Java code"""
         results = {}
         
         for pattern_name, pattern_info in self.design_patterns.items():
-            pattern = pattern_info["pattern"]
-            
             try:
-                matches = re.finditer(pattern, code, re.DOTALL)
-                results[pattern_name] = []
-                
-                for match in matches:
-                    results[pattern_name].append({
-                        "match": match.group(0)[:50] + "..." if len(match.group(0)) > 50 else match.group(0),
-                        "description": pattern_info["description"]
-                    })
+                results[pattern_name] = self._rule_findings(pattern_info, code, ascii_only)
             except:
                 # If regex fails, continue with empty results
                 results[pattern_name] = []
@@ -361,12 +518,13 @@ class CodeAnalyzer:
     def _estimate_complexity(self, code: str) -> Dict[str, Any]:
         """Estimate code complexity"""
         # Count decision points (branching)
-        if_count = len(re.findall(r'\bif\s*\(', code))
-        else_count = len(re.findall(r'\belse\b', code))
-        for_count = len(re.findall(r'\bfor\s*\(', code))
-        while_count = len(re.findall(r'\bwhile\s*\(', code))
-        case_count = len(re.findall(r'\bcase\s+', code))
-        catch_count = len(re.findall(r'\bcatch\s*\(', code))
+        branch_counts = Counter("".join(groups) for groups in BRANCH_PATTERN.findall(code))
+        if_count = branch_counts["if"]
+        else_count = branch_counts["else"]
+        for_count = branch_counts["for"]
+        while_count = branch_counts["while"]
+        case_count = branch_counts["case"]
+        catch_count = branch_counts["catch"]
         
         # Calculate cyclomatic complexity (approximation)
         # Each branching point adds 1 to complexity
@@ -376,25 +534,26 @@ class CodeAnalyzer:
         # Assess cognitive complexity
         cognitive_score = cyclomatic_complexity
         nested_blocks = 0
-        lines = code.split('\n')
         
         indent_level = 0
         max_indent = 0
         
-        # Estimate nesting depth by tracking indentation
-        for line in lines:
-            stripped = line.strip()
-            if not stripped:
-                continue
-                
-            if stripped.startswith('}'):
-                indent_level -= 1
-            
-            current_indent = len(line) - len(line.lstrip())
-            max_indent = max(max_indent, indent_level)
-            
-            if stripped.endswith('{'):
-                indent_level += 1
+        # Estimate nesting depth from the lines that open or close a block: the level
+        # drops on a line starting with '}' and rises after a line ending with '{'.
+        # A raised level only counts once a following line is not itself a close,
+        # so only those events are visited rather than every line.
+        events = [(match.end(), -1) for match in BLOCK_CLOSE_PATTERN.finditer(code)]
+        if FIRST_LINE_CLOSE_PATTERN.match(code):
+            events.append((0, -1))
+        events.extend((match.end(), 1) for match in BLOCK_OPEN_PATTERN.finditer(code))
+        events.sort()
+        
+        for position, change in events:
+            indent_level += change
+            if change > 0:
+                next_line = NEXT_TOKEN_PATTERN.match(code, position)
+                if next_line and next_line.group(1) != '}':
+                    max_indent = max(max_indent, indent_level)
         
         # Apply nesting penalty to cognitive complexity
         cognitive_score += max_indent * 2
@@ -422,4 +581,66 @@ class CodeAnalyzer:
                 "catch": catch_count
             },
             "complexity_rating": rating
-        }
\ No newline at end of file
+        }
+
+
+# Analyzer used by the module-level helpers, one per process
+_analyzer = CodeAnalyzer()
+
+
+def analyze_java_file(file_item: Tuple[str, str]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Analyze a single (file path, file content) pair
+
+    A module-level function so that it can be sent to worker processes.
+    """
+    file_path, file_content = file_item
+    return file_path, _analyzer.analyze_file(file_content, file_path)
+
+
+def analyze_file_items(file_items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Analyze (file path, file content) pairs, in worker processes for large inputs
+
+    Results are cached per file content, so reruns, repeated folder scans and
+    duplicated files only analyze content that hasn't been seen yet.
+
+    Returns:
+        The analysis results, in the same order as file_items
+    """
+    digests = [hashlib.blake2b(content.encode(), digest_size=16).hexdigest() for _, content in file_items]
+    
+    results = {}
+    with _analyzed_files_lock:
+        for digest in digests:
+            if digest in _analyzed_files:
+                _analyzed_files.move_to_end(digest)
+                results[digest] = _analyzed_files[digest]
+    
+    # Analyze the files that aren't cached yet
+    pending = {digest: file_item for digest, file_item in zip(digests, file_items) if digest not in results}
+    analyzed = {digest: result for digest, (_, result) in zip(pending, process_map(analyze_java_file, pending.values()))}
+    results.update(analyzed)
+    
+    with _analyzed_files_lock:
+        _analyzed_files.update(analyzed)
+        # Drop the least recently used files beyond the cache size
+        while len(_analyzed_files) > ANALYZED_FILE_CACHE_SIZE:
+            _analyzed_files.popitem(last=False)
+    
+    # A cached result may come from a copy of the file at another path
+    return [dict(results[digest], file_path=file_path) for digest, (file_path, _) in zip(digests, file_items)]
+
+
+def analyze_files(java_files: List[Dict]) -> Dict[str, Dict[str, Any]]:
+    """
+    Analyze every Java file, in worker processes for large inputs
+
+    Args:
+        java_files: List of dictionaries containing file paths and contents
+
+    Returns:
+        A dictionary of file paths to their analysis results
+    """
+    file_items = [(file_info["file_path"], file_info["content"]) for file_info in java_files]
+    return {result["file_path"]: result for result in analyze_file_items(file_items)}
@@ -39,14 +39,9 @@ class ClassDefinition(BaseModel):
     package: Optional[str] = ""
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "name": self.name,
-            "attributes": [attr.model_dump() for attr in self.attributes],
-            "methods": [method.model_dump() for method in self.methods],
-            "is_abstract": self.is_abstract,
-            "is_interface": self.is_interface,
-            "package": self.package
-        }
+        # The fields are already in this order, so one model_dump serializes the
+        # nested attributes and methods in a single pass
+        return self.model_dump()
 
 
 class UMLDiagram(BaseModel):
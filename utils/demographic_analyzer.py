@@ -0,0 +1,154 @@
+"""
+Demographic Data Analyzer for Java Code
+This module scans Java code for fields that may hold demographic or personal data.
+"""
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from utils.parallel import process_map
+
+DEMOGRAPHIC_KEYWORDS = [
+    "gender", "sex", "race", "ethnicity", "nationality", "religion",
+    "age", "dateOfBirth", "birthDate", "dob", "ssn", "socialSecurity",
+    "passport", "disability", "marital", "income", "salary", "address",
+    "zipCode", "postalCode", "phone", "email", "firstName", "lastName",
+    "fullName", "name"
+]
+
+
+def _keyword_patterns(keyword: str) -> List[re.Pattern]:
+    """Compile the patterns that match demographic data fields for a keyword"""
+    # Various patterns to match demographic data fields
+    patterns = [
+        # Field declaration
+        r'(?:private|protected|public)\s+\w+\s+(' + keyword + r'\w*)',
+        # Camel case variations
+        r'(?:private|protected|public)\s+\w+\s+(\w*' + keyword.capitalize() + r'\w*)',
+        # Getter/setter methods
+        r'(?:get|set)(' + keyword.capitalize() + r'\w*)\s*\(',
+    ]
+    return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+
+# (keyword, lowercase keyword for the substring prefilter, compiled patterns), built once
+KEYWORD_PATTERNS = [
+    (keyword, keyword.lower(), _keyword_patterns(keyword))
+    for keyword in DEMOGRAPHIC_KEYWORDS
+]
+
+# Every modifier position with the name it declares, and every get/set position with
+# the rest of its method name. The lookaheads make the scans overlapping, so each
+# keyword pattern's own (non-overlapping) matches can be picked out of them.
+DECLARATION_PATTERN = re.compile(r'(?=(?:private|protected|public)\s+\w+\s+(\w+))', re.IGNORECASE)
+ACCESSOR_PATTERN = re.compile(r'(?=(?:get|set)(\w+)\s*(\())', re.IGNORECASE)
+
+# Identifier tokens, counted once per file to give each field's occurrence count
+WORD_PATTERN = re.compile(r'\w+')
+
+# Splits combined code into [preamble, path, content, path, content, ...]
+FILE_HEADER_PATTERN = re.compile(r'# File: (.+?)[\r\n]+')
+
+
+def iter_code_files(code: str):
+    """Yield (file path, file content) pairs from code combined under '# File:' headers"""
+    # One split over the headers gives every file's content, in order
+    parts = FILE_HEADER_PATTERN.split(code)
+
+    for file, file_content in zip(parts[1::2], parts[2::2]):
+        if file_content:
+            yield file, file_content
+
+
+def _candidates(pattern: re.Pattern, content: str, end_group: int) -> List[Tuple[int, int, str, str]]:
+    """List (start, end, name, lowercase name) for every position the pattern matches"""
+    return [
+        (match.start(), match.end(end_group), match.group(1), match.group(1).lower())
+        for match in pattern.finditer(content)
+    ]
+
+
+def _select(candidates: List[Tuple[int, int, str, str]], accept) -> List[str]:
+    """Pick the names a keyword pattern would find, skipping candidates that overlap an earlier match"""
+    names = []
+    last_end = 0
+    for start, end, name, name_lower in candidates:
+        if start >= last_end and accept(name_lower):
+            names.append(name)
+            last_end = end
+    return names
+
+
+def scan_file(file_item: Tuple[str, str]) -> Tuple[str, List[Dict]]:
+    """
+    Scan a single file for demographic data fields
+
+    Args:
+        file_item: A (file path, file content) pair
+
+    Returns:
+        The file path and a list of the fields found in it
+    """
+    file, file_content = file_item
+
+    # Look for demographic keywords
+    file_results = []
+    found_fields = set()  # To track unique fields already found
+    word_counts = None  # Whole-word occurrence counts, built on first hit
+
+    # Every pattern contains its keyword, so keywords absent from the file can be
+    # skipped with a plain substring test. Case-insensitive regex matching also
+    # folds a few non-ASCII letters onto ASCII ones, so only ASCII files take the
+    # fast path; the rest run each keyword's compiled patterns.
+    if file_content.isascii():
+        lowered_content = file_content.lower()
+        declarations = _candidates(DECLARATION_PATTERN, file_content, 1)
+        accessors = _candidates(ACCESSOR_PATTERN, file_content, 2)
+    else:
+        lowered_content = None
+
+    for keyword, keyword_lower, patterns in KEYWORD_PATTERNS:
+        if lowered_content is None:
+            keyword_matches = [pattern.findall(file_content) for pattern in patterns]
+        elif keyword_lower not in lowered_content:
+            continue
+        else:
+            # The same three patterns, answered from one scan per pattern shape
+            keyword_matches = [
+                _select(declarations, lambda name: name.startswith(keyword_lower)),
+                _select(declarations, lambda name: keyword_lower in name),
+                _select(accessors, lambda name: name.startswith(keyword_lower)),
+            ]
+
+        for matches in keyword_matches:
+            for match in matches:
+                # Only add the field if it hasn't been found yet
+                if match.lower() not in found_fields:
+                    found_fields.add(match.lower())
+                    if word_counts is None:
+                        word_counts = Counter(WORD_PATTERN.findall(file_content))
+                    occurrence = {
+                        "field": match,
+                        "keyword": keyword,
+                        "count": word_counts.get(match, 0)
+                    }
+                    file_results.append(occurrence)
+
+    return file, file_results
+
+
+def analyze_demographic_data(code: str) -> Dict:
+    """
+    Analyze Java code for potential demographic data fields and occurrences
+
+    Files are independent, so large uploads are scanned in worker processes.
+
+    Returns a dictionary of files, fields, and occurrences
+    """
+    results = {}
+
+    for file, file_results in process_map(scan_file, iter_code_files(code)):
+        if file_results:
+            results[file] = file_results
+
+    return results
@@ -0,0 +1,96 @@
+"""
+Parallel Helpers
+This module fans CPU-bound per-file work (regex scanning, parsing) out to worker processes.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, List
+
+# Below this many items, starting worker processes costs more than it saves
+MIN_PARALLEL_ITEMS = 16
+
+# Threads for work that releases the GIL (decompression, I/O)
+MAX_THREADS = 8
+
+# Workers are started from a clean server process rather than forked from the app:
+# forking the multithreaded Streamlit server can deadlock the child. The workers only
+# run module-level functions, so nothing depends on inheriting the parent's state.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# One pool per process, started on first use and kept for later reruns
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, starting it on first use"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context(START_METHOD),
+            )
+        return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next call starts a new one"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False)
+
+
+def process_map(func: Callable[[Any], Any], items: Iterable[Any], chunksize: int = 8) -> List[Any]:
+    """
+    Apply func to every item, using the shared process pool for large inputs
+
+    Args:
+        func: A module-level function (it must be picklable)
+        items: The work items
+        chunksize: Number of items sent to a worker at a time
+
+    Returns:
+        The results, in the same order as items
+    """
+    items = list(items)
+    workers = os.cpu_count() or 1
+
+    if len(items) < MIN_PARALLEL_ITEMS or workers < 2:
+        return [func(item) for item in items]
+
+    pool = _get_process_pool()
+    try:
+        return list(pool.map(func, items, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the pool can't be used again
+        _discard_process_pool(pool)
+        raise
+
+
+def thread_map(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int = MAX_THREADS) -> List[Any]:
+    """
+    Apply func to every item, using a thread pool for large inputs
+
+    Only worthwhile when func spends its time outside the GIL, e.g. in zlib or file reads.
+
+    Args:
+        func: The function to apply
+        items: The work items
+        max_workers: Maximum number of threads
+
+    Returns:
+        The results, in the same order as items
+    """
+    items = list(items)
+
+    if len(items) < MIN_PARALLEL_ITEMS:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
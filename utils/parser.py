@@ -1,9 +1,60 @@
 import ast
+import hashlib
 import re
-from typing import List, Dict, Any, Optional, Tuple
-import json
+import sys
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Set, Tuple
 
 from utils.data_models import ClassDefinition, Attribute, Method, Relationship, UMLDiagram
+from utils.parallel import process_map
+
+BRACE_PATTERN = re.compile(r'[{}]')
+
+# The fields of Python AST nodes that hold statements, in the order the nodes declare
+# them. Classes are statements, and only statements, exception handlers and match
+# cases contain statements, so these are the only fields that can lead to a class.
+PYTHON_STATEMENT_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+# UML visibility of a Python name, indexed by its number of leading underscores (up to two)
+PYTHON_VISIBILITY = ("+", "#", "-")
+# UML visibility of a Java access modifier; no modifier is shown as public
+JAVA_VISIBILITY = {"private": "-", "protected": "#"}
+
+# Java declarations. A match can't start inside a run of whitespace unless one
+# starting where the run begins would, so the lookarounds turn those positions away
+# at once instead of backtracking through the rest of the run from each of them.
+JAVA_PACKAGE_PATTERN = re.compile(r'package\s+([\w.]+);')
+JAVA_CLASS_PATTERN = re.compile(
+    r'(public\s+|private\s+|protected\s+|(?<!\s)(?=[\saci])\s*)'
+    r'(abstract\s+)?(class|interface)\s+(\w+)'
+    r'(\s+extends\s+(\w+))?(\s+implements\s+([^{]+))?'
+)
+JAVA_ATTRIBUTE_PATTERN = re.compile(
+    r'(?:(public|private|protected)|(?<!\s))\s+(static\s+)?(final\s+)?'
+    r'(\w+)\s+(\w+)\s*(?:=\s*[^;]+)?;'
+)
+JAVA_METHOD_PATTERN = re.compile(
+    r'(?:(public|private|protected)|(?<!\s))\s+(static\s+)?(abstract\s+)?'
+    r'(\w+)\s+(\w+)\s*\((.*?)\)\s*(?:\{|;)'
+)
+
+# JavaScript declarations
+JS_CLASS_PATTERN = re.compile(r'class\s+(\w+)(?:\s+extends\s+(\w+))?\s*\{')
+# Constructor, normal methods and getters/setters
+JS_METHOD_PATTERN = re.compile(r'(?:static\s+)?(?:async\s+)?(?:get|set|constructor|\w+)\s*\([^)]*\)\s*\{')
+JS_METHOD_NAME_PATTERN = re.compile(r'(?:static\s+)?(?:async\s+)?(?:get|set|\w+)')
+JS_PARAMS_PATTERN = re.compile(r'\((.*?)\)')
+JS_CONSTRUCTOR_PATTERN = re.compile(r'constructor\s*\([^)]*\)\s*\{([\s\S]*?)(?:\}|$)')
+JS_ATTRIBUTE_PATTERN = re.compile(r'this\.(\w+)\s*=')
+JS_STATIC_ATTRIBUTE_PATTERN = re.compile(r'static\s+(\w+)\s*=')
+
+# Per-file parse results keyed by (parse function, content digest), least recently
+# used first. Guarded by a lock because Streamlit serves each session from its own thread.
+PARSED_FILE_CACHE_SIZE = 4096
+_parsed_files = OrderedDict()
+_parsed_files_lock = threading.Lock()
 
 
 class CodeParser:
@@ -16,134 +67,173 @@ class PythonParser(CodeParser):
     """Parser for Python code"""
     def parse(self, code: str) -> UMLDiagram:
         try:
-            tree = ast.parse(code)
-            
-            classes = []
-            relationships = []
+            return merge_python_classes([self._parse_source(code)])
+        
+        except Exception as e:
+            raise ValueError(f"Error parsing Python code: {str(e)}")
+    
+    def parse_files(self, files: List[Tuple[str, str]]) -> UMLDiagram:
+        """
+        Parse Python source files one at a time and merge the results
+        
+        Gives the same diagram as parsing the files combined, but results are cached
+        per file content, so re-uploading a project only parses the files that changed.
+        
+        Args:
+            files: (file path, source) pairs
+        """
+        try:
+            return merge_python_classes(parse_cached_files(parse_python_file, files))
+        
+        except Exception as e:
+            raise ValueError(f"Error parsing Python code: {str(e)}")
+    
+    @staticmethod
+    def _parse_source(code: str) -> List[Tuple[int, ClassDefinition, List[Relationship]]]:
+        """
+        Extract the class definitions from Python source
+        
+        Classes are listed level by level through the syntax tree (the order of
+        ast.walk), each with its depth in the tree. Inheritance relationships are
+        returned for every named base; use resolve_relationships to keep those
+        between known classes.
+        
+        Returns:
+            (depth, class, relationships) for every class, nested ones included
+        """
+        tree = ast.parse(code)
+        
+        classes = []
+        
+        # Walk the statements a level at a time, keeping each class node's depth.
+        # Expressions can't contain classes, so they are never descended into.
+        class_nodes = []
+        depth = 0
+        level = [tree]
+        while level:
+            class_nodes.extend((depth, node) for node in level if type(node) is ast.ClassDef)
+            level = [
+                child
+                for node in level
+                for field in PYTHON_STATEMENT_FIELDS
+                for child in getattr(node, field, ())
+            ]
+            depth += 1
+        
+        for depth, node in class_nodes:
+            # Class info
+            class_is_abstract = any(
+                type(decorator) is ast.Name and decorator.id == 'abstractmethod'
+                for decorator in node.decorator_list
+            )
             
-            class_names = set()
+            # Members are collected in local lists and handed to the class at the end
+            attributes = []
+            methods = []
             
-            # First pass: collect all class names
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    class_names.add(node.name)
+            # Get inheritance relationships
+            relationships = []
+            for base in node.bases:
+                if type(base) is ast.Name:
+                    relationships.append(
+                        Relationship(
+                            source=node.name,
+                            target=base.id,
+                            type="inheritance"
+                        )
+                    )
             
-            # Second pass: extract class definitions and relationships
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    # Class info
-                    class_def = ClassDefinition(name=node.name)
+            # Get attributes and methods. Parsed nodes are exactly the ast classes,
+            # so plain type identity checks stand in for isinstance
+            for item in node.body:
+                # Get class attributes
+                if type(item) is ast.AnnAssign and type(item.target) is ast.Name:
+                    # Type annotated attribute
+                    name = item.target.id
+                    visibility = PYTHON_VISIBILITY[(name[:1] == "_") + (name[:2] == "__")]
                     
-                    # Check if class is abstract
-                    for decorator in node.decorator_list:
-                        if isinstance(decorator, ast.Name) and decorator.id == 'abstractmethod':
-                            class_def.is_abstract = True
+                    type_name = ""
+                    if type(item.annotation) is ast.Name:
+                        type_name = item.annotation.id
+                    elif type(item.annotation) is ast.Subscript:
+                        if type(item.annotation.value) is ast.Name:
+                            # Names from the AST are already interned; share the built ones too
+                            type_name = sys.intern(item.annotation.value.id + "[...]")
                     
-                    # Get inheritance relationships
-                    for base in node.bases:
-                        if isinstance(base, ast.Name) and base.id in class_names:
-                            relationships.append(
-                                Relationship(
-                                    source=node.name,
-                                    target=base.id,
-                                    type="inheritance"
-                                )
-                            )
-                    
-                    # Get attributes and methods
-                    for item in node.body:
-                        # Get class attributes
-                        if isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name):
-                            # Type annotated attribute
-                            visibility = "+"
-                            if item.target.id.startswith("__"):
-                                visibility = "-"
-                            elif item.target.id.startswith("_"):
-                                visibility = "#"
-                            
-                            type_name = ""
-                            if isinstance(item.annotation, ast.Name):
-                                type_name = item.annotation.id
-                            elif isinstance(item.annotation, ast.Subscript):
-                                if isinstance(item.annotation.value, ast.Name):
-                                    type_name = item.annotation.value.id + "[...]"
+                    attributes.append(
+                        Attribute(
+                            name=item.target.id,
+                            type=type_name,
+                            visibility=visibility
+                        )
+                    )
+                elif type(item) is ast.Assign:
+                    for target in item.targets:
+                        if type(target) is ast.Name:
+                            name = target.id
+                            visibility = PYTHON_VISIBILITY[(name[:1] == "_") + (name[:2] == "__")]
                             
-                            class_def.attributes.append(
+                            attributes.append(
                                 Attribute(
-                                    name=item.target.id,
-                                    type=type_name,
+                                    name=target.id,
                                     visibility=visibility
                                 )
                             )
-                        elif isinstance(item, ast.Assign):
-                            for target in item.targets:
-                                if isinstance(target, ast.Name):
-                                    visibility = "+"
-                                    if target.id.startswith("__"):
-                                        visibility = "-"
-                                    elif target.id.startswith("_"):
-                                        visibility = "#"
-                                    
-                                    class_def.attributes.append(
-                                        Attribute(
-                                            name=target.id,
-                                            visibility=visibility
-                                        )
-                                    )
-                        
-                        # Get methods
-                        elif isinstance(item, ast.FunctionDef):
-                            visibility = "+"
-                            if item.name.startswith("__") and not item.name.endswith("__"):
-                                visibility = "-"
-                            elif item.name.startswith("_"):
-                                visibility = "#"
-                            
-                            is_static = False
-                            is_abstract = False
-                            
-                            # Check decorators for static/abstract
-                            for decorator in item.decorator_list:
-                                if isinstance(decorator, ast.Name):
-                                    if decorator.id == 'staticmethod':
-                                        is_static = True
-                                    elif decorator.id == 'abstractmethod':
-                                        is_abstract = True
-                            
-                            # Parse parameters
-                            params = []
-                            for arg in item.args.args:
-                                if arg.arg != 'self' and arg.arg != 'cls':
-                                    param_type = ""
-                                    if arg.annotation and isinstance(arg.annotation, ast.Name):
-                                        param_type = arg.annotation.id
-                                    params.append({"name": arg.arg, "type": param_type})
-                            
-                            # Return type
-                            return_type = ""
-                            if item.returns:
-                                if isinstance(item.returns, ast.Name):
-                                    return_type = item.returns.id
-                                elif isinstance(item.returns, ast.Constant) and item.returns.value is None:
-                                    return_type = "None"
-                            
-                            class_def.methods.append(
-                                Method(
-                                    name=item.name,
-                                    return_type=return_type,
-                                    parameters=params,
-                                    visibility=visibility,
-                                    is_static=is_static,
-                                    is_abstract=is_abstract
-                                )
-                            )
+                
+                # Get methods
+                elif type(item) is ast.FunctionDef:
+                    # Dunder methods are protected rather than private
+                    name = item.name
+                    visibility = PYTHON_VISIBILITY[(name[:1] == "_") + (name[:2] == "__" and name[-2:] != "__")]
+                    
+                    is_static = False
+                    is_abstract = False
                     
-                    classes.append(class_def)
+                    # Check decorators for static/abstract
+                    for decorator in item.decorator_list:
+                        if type(decorator) is ast.Name:
+                            if decorator.id == 'staticmethod':
+                                is_static = True
+                            elif decorator.id == 'abstractmethod':
+                                is_abstract = True
+                    
+                    # Parse parameters
+                    params = []
+                    for arg in item.args.args:
+                        if arg.arg != 'self' and arg.arg != 'cls':
+                            param_type = ""
+                            if arg.annotation and type(arg.annotation) is ast.Name:
+                                param_type = arg.annotation.id
+                            params.append({"name": arg.arg, "type": param_type})
+                    
+                    # Return type
+                    return_type = ""
+                    if item.returns:
+                        if type(item.returns) is ast.Name:
+                            return_type = item.returns.id
+                        elif type(item.returns) is ast.Constant and item.returns.value is None:
+                            return_type = "None"
+                    
+                    methods.append(
+                        Method(
+                            name=item.name,
+                            return_type=return_type,
+                            parameters=params,
+                            visibility=visibility,
+                            is_static=is_static,
+                            is_abstract=is_abstract
+                        )
+                    )
             
-            return UMLDiagram(classes=classes, relationships=relationships)
+            class_def = ClassDefinition(
+                name=node.name,
+                attributes=attributes,
+                methods=methods,
+                is_abstract=class_is_abstract
+            )
+            classes.append((depth, class_def, relationships))
         
-        except Exception as e:
-            raise ValueError(f"Error parsing Python code: {str(e)}")
+        return classes
 
 
 class JavaParser(CodeParser):
@@ -154,334 +244,436 @@ class JavaParser(CodeParser):
             if not code or len(code) < 10:  # Basic validation
                 raise ValueError("Input code is too short or empty")
                 
-            classes = []
-            relationships = []
+            classes, relationships, class_names = self._parse_source(code)
             
-            # First extract package declarations
-            package_pattern = r'package\s+([\w.]+);'
-            current_package = None
-            for package_match in re.finditer(package_pattern, code):
-                current_package = package_match.group(1)
-                
-            # Find class definitions with improved regex
-            class_pattern = r'(public\s+|private\s+|protected\s+|\s*)' + \
-                            r'(abstract\s+)?(class|interface)\s+(\w+)' + \
-                            r'(\s+extends\s+(\w+))?(\s+implements\s+([^{]+))?'
+            if not class_names:
+                raise ValueError("No Java classes or interfaces found in the code")
             
-            # First search for classes in the code
-            class_matches = list(re.finditer(class_pattern, code))
+            return UMLDiagram(classes=classes, relationships=resolve_relationships(relationships, class_names))
             
-            if not class_matches:
-                raise ValueError("No Java classes or interfaces found in the code")
-                
+        except Exception as e:
+            raise ValueError(f"Error parsing Java code: {str(e)}")
+    
+    def parse_files(self, files: List[Tuple[str, str]]) -> UMLDiagram:
+        """
+        Parse Java source files one at a time and merge the results
+        
+        Files are parsed in worker processes when there are many of them. Each class
+        takes its package and body from its own file, and relationships are resolved
+        against the classes of all files. Results are cached per file content, so
+        re-uploading a project only parses the files that changed.
+        
+        Args:
+            files: (file path, source) pairs
+        """
+        try:
+            classes = []
+            relationships = []
             class_names = set()
             
-            # First pass - collect class names
-            for match in class_matches:
-                class_name = match.group(4)
-                if class_name:  # Ensure the class name is valid
-                    class_names.add(class_name)
+            for file_classes, file_relationships, file_class_names in parse_cached_files(parse_java_file, files):
+                classes.extend(file_classes)
+                relationships.extend(file_relationships)
+                class_names.update(file_class_names)
             
-            # Check if we found any valid class names
             if not class_names:
-                raise ValueError("Could not extract valid class names from the code")
-                
-            # Reset for second pass
-            class_matches = re.finditer(class_pattern, code)
-            
-            for match in class_matches:
-                access = match.group(1).strip()
-                is_abstract = match.group(2) is not None
-                is_interface = match.group(3) == 'interface'
-                class_name = match.group(4)
-                
-                extends = match.group(6)
-                implements = match.group(8)
-                
-                class_def = ClassDefinition(
-                    name=class_name,
-                    is_abstract=is_abstract,
-                    is_interface=is_interface,
-                    package=current_package
+                raise ValueError("No Java classes or interfaces found in the code")
+            
+            return UMLDiagram(classes=classes, relationships=resolve_relationships(relationships, class_names))
+            
+        except Exception as e:
+            raise ValueError(f"Error parsing Java code: {str(e)}")
+    
+    @staticmethod
+    def _parse_source(code: str) -> Tuple[List[ClassDefinition], List[Relationship], Set[str]]:
+        """
+        Extract the class definitions from Java source
+        
+        Inheritance and implementation relationships are returned for every named
+        supertype; use resolve_relationships to keep those between known classes.
+        
+        Returns:
+            The classes, their relationships and the names of all declared classes
+        """
+        classes = []
+        relationships = []
+        
+        # First extract package declarations
+        current_package = None
+        for package_match in JAVA_PACKAGE_PATTERN.finditer(code):
+            current_package = package_match.group(1)
+            
+        # First search for classes in the code
+        class_matches = list(JAVA_CLASS_PATTERN.finditer(code))
+            
+        class_names = set()
+        block_ends = match_braces(code) if class_matches else {}
+        
+        # First pass - collect class names
+        for match in class_matches:
+            class_name = match.group(4)
+            if class_name:  # Ensure the class name is valid
+                class_names.add(class_name)
+            
+        for match in class_matches:
+            access = match.group(1).strip()
+            is_abstract = match.group(2) is not None
+            is_interface = match.group(3) == 'interface'
+            class_name = match.group(4)
+            
+            extends = match.group(6)
+            implements = match.group(8)
+            
+            class_def = ClassDefinition(
+                name=class_name,
+                is_abstract=is_abstract,
+                is_interface=is_interface,
+                package=current_package
+            )
+            
+            # Add inheritance relationships
+            if extends:
+                relationships.append(
+                    Relationship(
+                        source=class_name,
+                        target=extends,
+                        type="inheritance"
+                    )
                 )
-                
-                # Add inheritance relationships
-                if extends and extends in class_names:
+            
+            if implements:
+                for interface in [i.strip() for i in implements.split(',')]:
                     relationships.append(
                         Relationship(
                             source=class_name,
-                            target=extends,
-                            type="inheritance"
+                            target=interface,
+                            type="implementation"
                         )
                     )
-                
-                if implements:
-                    for interface in [i.strip() for i in implements.split(',')]:
-                        if interface in class_names:
-                            relationships.append(
-                                Relationship(
-                                    source=class_name,
-                                    target=interface,
-                                    type="implementation"
-                                )
-                            )
-                
-                # Find the class body
-                class_start = code.find('{', code.find(class_name))
-                if class_start == -1:
-                    continue
-                
-                # Balance brackets to find the end of the class
-                bracket_count = 1
-                class_end = class_start + 1
-                
-                while bracket_count > 0 and class_end < len(code):
-                    if code[class_end] == '{':
-                        bracket_count += 1
-                    elif code[class_end] == '}':
-                        bracket_count -= 1
-                    class_end += 1
-                
-                class_body = code[class_start+1:class_end-1]
-                
-                # Find attributes
-                attr_pattern = r'(public|private|protected)?\s+(static\s+)?(final\s+)?' + \
-                               r'(\w+)\s+(\w+)\s*(?:=\s*[^;]+)?;'
-                
-                for attr_match in re.finditer(attr_pattern, class_body):
-                    visibility = "+"
-                    if attr_match.group(1) == "private":
-                        visibility = "-"
-                    elif attr_match.group(1) == "protected":
-                        visibility = "#"
-                    
-                    is_static = attr_match.group(2) is not None
-                    attr_type = attr_match.group(4)
-                    attr_name = attr_match.group(5)
-                    
-                    class_def.attributes.append(
-                        Attribute(
-                            name=attr_name,
-                            type=attr_type,
-                            visibility=visibility,
-                            is_static=is_static
-                        )
-                    )
-                
-                # Find methods
-                method_pattern = r'(public|private|protected)?\s+(static\s+)?(abstract\s+)?' + \
-                                r'(\w+)\s+(\w+)\s*\((.*?)\)\s*(?:\{|;)'
-                
-                for method_match in re.finditer(method_pattern, class_body):
-                    visibility = "+"
-                    if method_match.group(1) == "private":
-                        visibility = "-"
-                    elif method_match.group(1) == "protected":
-                        visibility = "#"
-                    
-                    is_static = method_match.group(2) is not None
-                    is_abstract = method_match.group(3) is not None
-                    return_type = method_match.group(4)
-                    method_name = method_match.group(5)
-                    params_str = method_match.group(6).strip()
-                    
-                    params = []
-                    if params_str:
-                        param_list = params_str.split(',')
-                        for param in param_list:
-                            param = param.strip()
-                            if ' ' in param:
-                                param_parts = param.split(' ')
-                                param_type = param_parts[0]
-                                param_name = param_parts[1]
-                                params.append({"name": param_name, "type": param_type})
-                    
-                    class_def.methods.append(
-                        Method(
-                            name=method_name,
-                            return_type=return_type,
-                            parameters=params,
-                            visibility=visibility,
-                            is_static=is_static,
-                            is_abstract=is_abstract
-                        )
+            
+            # Find the class body
+            class_start = code.find('{', code.find(class_name))
+            if class_start == -1:
+                continue
+            
+            # The end of the class, from the brace matching done once for the file
+            class_end = block_ends.get(class_start, len(code))
+            
+            class_body = code[class_start+1:class_end-1]
+            
+            # Find attributes
+            for attr_match in JAVA_ATTRIBUTE_PATTERN.finditer(class_body):
+                visibility = JAVA_VISIBILITY.get(attr_match.group(1), "+")
+                
+                is_static = attr_match.group(2) is not None
+                # Type names repeat across a project, so keep one copy of each
+                attr_type = sys.intern(attr_match.group(4))
+                attr_name = attr_match.group(5)
+                
+                class_def.attributes.append(
+                    Attribute(
+                        name=attr_name,
+                        type=attr_type,
+                        visibility=visibility,
+                        is_static=is_static
                     )
-                
-                classes.append(class_def)
+                )
             
-            return UMLDiagram(classes=classes, relationships=relationships)
+            # Find methods
+            for method_match in JAVA_METHOD_PATTERN.finditer(class_body):
+                visibility = JAVA_VISIBILITY.get(method_match.group(1), "+")
+                
+                is_static = method_match.group(2) is not None
+                is_abstract = method_match.group(3) is not None
+                return_type = sys.intern(method_match.group(4))
+                method_name = method_match.group(5)
+                params_str = method_match.group(6).strip()
+                
+                params = []
+                if params_str:
+                    param_list = params_str.split(',')
+                    for param in param_list:
+                        param = param.strip()
+                        # The type is the first word and the name the second; partition
+                        # stops at those instead of splitting the whole parameter
+                        param_type, space, rest = param.partition(' ')
+                        if space:
+                            param_name = rest.partition(' ')[0]
+                            params.append({"name": param_name, "type": sys.intern(param_type)})
+                
+                class_def.methods.append(
+                    Method(
+                        name=method_name,
+                        return_type=return_type,
+                        parameters=params,
+                        visibility=visibility,
+                        is_static=is_static,
+                        is_abstract=is_abstract
+                    )
+                )
             
-        except Exception as e:
-            raise ValueError(f"Error parsing Java code: {str(e)}")
+            classes.append(class_def)
+        
+        return classes, relationships, class_names
+
+
+def match_braces(code: str) -> Dict[int, int]:
+    """
+    Match every brace in the code in one pass
+    
+    Only the braces are visited, located by the regex engine, instead of every character.
+    
+    Returns:
+        The index of each opening brace mapped to the index just past its closing
+        brace; unbalanced opening braces are left out
+    """
+    block_ends = {}
+    open_braces = []
+    for brace in BRACE_PATTERN.finditer(code):
+        if brace.group() == '{':
+            open_braces.append(brace.start())
+        elif open_braces:
+            block_ends[open_braces.pop()] = brace.end()
+    
+    return block_ends
+
+
+def parse_cached_files(parse_file, files: List[Tuple[str, str]]) -> List[Any]:
+    """
+    Apply a per-file parse function to (file path, source) pairs, reusing cached results
+    
+    Only the files whose content isn't cached yet are parsed, in worker processes
+    when there are many of them.
+    
+    Args:
+        parse_file: A module-level function taking a (file path, source) pair
+        files: (file path, source) pairs
+    
+    Returns:
+        The parse results, in the same order as files
+    """
+    keys = [
+        (parse_file.__name__, hashlib.blake2b(source.encode(), digest_size=16).hexdigest())
+        for _, source in files
+    ]
+    
+    results = {}
+    with _parsed_files_lock:
+        for key in keys:
+            if key in _parsed_files:
+                _parsed_files.move_to_end(key)
+                results[key] = _parsed_files[key]
+    
+    # Parse the files that aren't cached yet
+    pending = {key: file_item for key, file_item in zip(keys, files) if key not in results}
+    parsed = dict(zip(pending, process_map(parse_file, pending.values())))
+    results.update(parsed)
+    
+    with _parsed_files_lock:
+        _parsed_files.update(parsed)
+        # Drop the least recently used files beyond the cache size
+        while len(_parsed_files) > PARSED_FILE_CACHE_SIZE:
+            _parsed_files.popitem(last=False)
+    
+    return [results[key] for key in keys]
+
+
+def parse_java_file(file_item: Tuple[str, str]) -> Tuple[List[ClassDefinition], List[Relationship], Set[str]]:
+    """Parse a single (file path, source) pair; used as a process pool worker"""
+    _, source = file_item
+    return JavaParser._parse_source(source)
+
+
+def parse_python_file(file_item: Tuple[str, str]) -> List[Tuple[int, ClassDefinition, List[Relationship]]]:
+    """Parse a single (file path, source) pair; used as a process pool worker"""
+    _, source = file_item
+    return PythonParser._parse_source(source)
+
+
+def merge_python_classes(file_results: List[List[Tuple[int, ClassDefinition, List[Relationship]]]]) -> UMLDiagram:
+    """
+    Build a diagram from the classes of one or more Python files
+    
+    Each file lists its classes level by level, so merging the files' levels (a
+    stable sort on depth) gives the order of walking the files' combined code.
+    """
+    entries = sorted((entry for file_entries in file_results for entry in file_entries), key=itemgetter(0))
+    
+    classes = [class_def for _, class_def, _ in entries]
+    relationships = [relationship for _, _, class_relationships in entries for relationship in class_relationships]
+    class_names = {class_def.name for class_def in classes}
+    
+    return UMLDiagram(classes=classes, relationships=resolve_relationships(relationships, class_names))
+
+
+def resolve_relationships(relationships: List[Relationship], class_names: Set[str]) -> List[Relationship]:
+    """Keep the relationships whose target is one of the given classes"""
+    return [rel for rel in relationships if rel.target in class_names]
 
 
 class JavaScriptParser(CodeParser):
     """Parser for JavaScript code"""
     def parse(self, code: str) -> UMLDiagram:
+        try:
+            classes, relationships = self._parse_source(code)
+            return UMLDiagram(classes=classes, relationships=relationships)
+            
+        except Exception as e:
+            raise ValueError(f"Error parsing JavaScript code: {str(e)}")
+    
+    def parse_files(self, files: List[Tuple[str, str]]) -> UMLDiagram:
+        """
+        Parse JavaScript source files one at a time and merge the results
+        
+        Files are parsed in worker processes when there are many of them, and results
+        are cached per file content, so re-uploading a project only parses the files
+        that changed.
+        
+        Args:
+            files: (file path, source) pairs
+        """
         try:
             classes = []
             relationships = []
             
-            # Find ES6 class definitions
-            class_pattern = r'class\s+(\w+)(?:\s+extends\s+(\w+))?\s*\{'
+            for file_classes, file_relationships in parse_cached_files(parse_javascript_file, files):
+                classes.extend(file_classes)
+                relationships.extend(file_relationships)
             
-            class_matches = re.finditer(class_pattern, code)
+            return UMLDiagram(classes=classes, relationships=relationships)
             
-            for match in class_matches:
-                class_name = match.group(1)
-                extends = match.group(2)
-                
-                class_def = ClassDefinition(name=class_name)
-                
-                # Add inheritance relationships
-                if extends:
-                    relationships.append(
-                        Relationship(
-                            source=class_name,
-                            target=extends,
-                            type="inheritance"
-                        )
+        except Exception as e:
+            raise ValueError(f"Error parsing JavaScript code: {str(e)}")
+    
+    @staticmethod
+    def _parse_source(code: str) -> Tuple[List[ClassDefinition], List[Relationship]]:
+        """
+        Extract the ES6 class definitions from JavaScript source
+        
+        Returns:
+            The classes and their inheritance relationships
+        """
+        classes = []
+        relationships = []
+        
+        # Find ES6 class definitions
+        class_matches = list(JS_CLASS_PATTERN.finditer(code))
+        block_ends = match_braces(code) if class_matches else {}
+        
+        for match in class_matches:
+            class_name = match.group(1)
+            extends = match.group(2)
+            
+            class_def = ClassDefinition(name=class_name)
+            
+            # Add inheritance relationships
+            if extends:
+                relationships.append(
+                    Relationship(
+                        source=class_name,
+                        target=extends,
+                        type="inheritance"
                     )
-                
-                # Find the class body
-                class_start = code.find('{', match.start())
-                if class_start == -1:
-                    continue
-                
-                # Balance brackets to find the end of the class
-                bracket_count = 1
-                class_end = class_start + 1
-                
-                while bracket_count > 0 and class_end < len(code):
-                    if code[class_end] == '{':
-                        bracket_count += 1
-                    elif code[class_end] == '}':
-                        bracket_count -= 1
-                    class_end += 1
-                
-                class_body = code[class_start+1:class_end-1]
-                
-                # Find class methods
-                # Match constructor, normal methods and getters/setters
-                method_pattern = r'(?:static\s+)?(?:async\s+)?(?:get|set|constructor|\w+)\s*\([^)]*\)\s*\{'
-                
-                current_pos = 0
-                for method_match in re.finditer(method_pattern, class_body):
-                    method_def = method_match.group(0)
-                    
-                    is_static = 'static' in method_def
-                    
-                    # Extract method name
-                    if 'constructor' in method_def:
-                        method_name = 'constructor'
+                )
+            
+            # Find the class body
+            class_start = code.find('{', match.start())
+            if class_start == -1:
+                continue
+            
+            # The end of the class, from the brace matching done once for the code
+            class_end = block_ends.get(class_start, len(code))
+            
+            class_body = code[class_start+1:class_end-1]
+            
+            # Find class methods
+            for method_match in JS_METHOD_PATTERN.finditer(class_body):
+                method_def = method_match.group(0)
+                
+                is_static = 'static' in method_def
+                
+                # Extract method name
+                if 'constructor' in method_def:
+                    method_name = 'constructor'
+                else:
+                    name_match = JS_METHOD_NAME_PATTERN.search(method_def)
+                    if name_match:
+                        method_name = name_match.group(0)
+                        if 'static' in method_name:
+                            method_name = method_name.replace('static', '').strip()
+                        if 'async' in method_name:
+                            method_name = method_name.replace('async', '').strip()
                     else:
-                        name_match = re.search(r'(?:static\s+)?(?:async\s+)?(?:get|set|\w+)', method_def)
-                        if name_match:
-                            method_name = name_match.group(0)
-                            if 'static' in method_name:
-                                method_name = method_name.replace('static', '').strip()
-                            if 'async' in method_name:
-                                method_name = method_name.replace('async', '').strip()
-                        else:
-                            continue
-                    
-                    # Extract parameters
-                    params = []
-                    params_match = re.search(r'\((.*?)\)', method_def)
-                    if params_match:
-                        params_str = params_match.group(1)
-                        if params_str:
-                            param_list = params_str.split(',')
-                            for param in param_list:
-                                param = param.strip()
-                                if param and param != '':
-                                    # Remove default values
-                                    if '=' in param:
-                                        param = param.split('=')[0].strip()
-                                    params.append({"name": param, "type": ""})
-                    
-                    class_def.methods.append(
-                        Method(
-                            name=method_name,
-                            parameters=params,
-                            visibility="+",  # JavaScript doesn't have explicit visibility
-                            is_static=is_static
-                        )
-                    )
-                
-                # Find class attributes (from constructor)
-                constructor_pattern = r'constructor\s*\([^)]*\)\s*\{([\s\S]*?)(?:\}|$)'
-                constructor_match = re.search(constructor_pattern, class_body)
-                
-                if constructor_match:
-                    constructor_body = constructor_match.group(1)
-                    # Find this.x = y patterns for attributes
-                    attr_pattern = r'this\.(\w+)\s*='
-                    
-                    for attr_match in re.finditer(attr_pattern, constructor_body):
-                        attr_name = attr_match.group(1)
-                        class_def.attributes.append(
-                            Attribute(
-                                name=attr_name,
-                                visibility="+",  # JavaScript doesn't have explicit visibility
-                            )
-                        )
+                        continue
                 
-                # Find static attributes
-                static_attr_pattern = r'static\s+(\w+)\s*='
-                for static_attr_match in re.finditer(static_attr_pattern, class_body):
-                    attr_name = static_attr_match.group(1)
+                # Extract parameters
+                params = []
+                params_match = JS_PARAMS_PATTERN.search(method_def)
+                if params_match:
+                    params_str = params_match.group(1)
+                    if params_str:
+                        param_list = params_str.split(',')
+                        for param in param_list:
+                            param = param.strip()
+                            if param:
+                                # Remove default values
+                                if '=' in param:
+                                    param = param.partition('=')[0].strip()
+                                params.append({"name": param, "type": ""})
+                
+                class_def.methods.append(
+                    Method(
+                        name=method_name,
+                        parameters=params,
+                        visibility="+",  # JavaScript doesn't have explicit visibility
+                        is_static=is_static
+                    )
+                )
+            
+            # Find class attributes (from constructor)
+            constructor_match = JS_CONSTRUCTOR_PATTERN.search(class_body)
+            
+            if constructor_match:
+                constructor_body = constructor_match.group(1)
+                # Find this.x = y patterns for attributes
+                for attr_match in JS_ATTRIBUTE_PATTERN.finditer(constructor_body):
+                    attr_name = attr_match.group(1)
                     class_def.attributes.append(
                         Attribute(
                             name=attr_name,
                             visibility="+",  # JavaScript doesn't have explicit visibility
-                            is_static=True
                         )
                     )
-                
-                classes.append(class_def)
             
-            return UMLDiagram(classes=classes, relationships=relationships)
+            # Find static attributes
+            for static_attr_match in JS_STATIC_ATTRIBUTE_PATTERN.finditer(class_body):
+                attr_name = static_attr_match.group(1)
+                class_def.attributes.append(
+                    Attribute(
+                        name=attr_name,
+                        visibility="+",  # JavaScript doesn't have explicit visibility
+                        is_static=True
+                    )
+                )
             
-        except Exception as e:
-            raise ValueError(f"Error parsing JavaScript code: {str(e)}")
+            classes.append(class_def)
+        
+        return classes, relationships
+
+
+def parse_javascript_file(file_item: Tuple[str, str]) -> Tuple[List[ClassDefinition], List[Relationship]]:
+    """Parse a single (file path, source) pair; used as a process pool worker"""
+    _, source = file_item
+    return JavaScriptParser._parse_source(source)
 
 
 class ManualInputParser:
     """Parser for JSON input containing manual class definitions"""
     def parse(self, json_str: str) -> UMLDiagram:
         try:
-            data = json.loads(json_str)
-            
-            classes = []
-            relationships = []
-            
-            # Parse classes
-            for class_data in data.get('classes', []):
-                attributes = []
-                for attr in class_data.get('attributes', []):
-                    attributes.append(Attribute(**attr))
-                
-                methods = []
-                for method in class_data.get('methods', []):
-                    methods.append(Method(**method))
-                
-                class_def = ClassDefinition(
-                    name=class_data['name'],
-                    attributes=attributes,
-                    methods=methods,
-                    is_abstract=class_data.get('is_abstract', False),
-                    is_interface=class_data.get('is_interface', False),
-                    package=class_data.get('package', '')
-                )
-                
-                classes.append(class_def)
-            
-            # Parse relationships
-            for rel in data.get('relationships', []):
-                relationships.append(Relationship(**rel))
-            
-            return UMLDiagram(classes=classes, relationships=relationships)
+            # Pydantic reads the JSON straight into the models in its compiled core,
+            # without building the intermediate dicts and lists first
+            return UMLDiagram.model_validate_json(json_str)
             
         except Exception as e:
             raise ValueError(f"Error parsing manual input: {str(e)}")
@@ -1,6 +1,6 @@
 import streamlit as st
 from utils.data_models import UMLDiagram, ClassDefinition, Attribute, Method, Relationship
-from utils.uml_generator import UMLGenerator
+from utils.uml_generator import UMLGenerator, pipe_cached
 
 # Create a simple test UML diagram
 def create_test_diagram():
@@ -58,15 +58,25 @@ def create_test_diagram():
     
     return diagram
 
+# The test diagram never changes, so its SVG is generated once and reused on every rerun.
+# A failed render raises rather than being cached, so the next rerun tries again.
+@st.cache_data(show_spinner=False)
+def cached_test_svg() -> str:
+    """SVG of the test diagram"""
+    return pipe_cached(UMLGenerator().generate(create_test_diagram())).decode('utf-8')
+
+
+def render_test_svg() -> str:
+    """SVG of the test diagram, or the generator's error SVG (not cached) if rendering fails"""
+    try:
+        return cached_test_svg()
+    except Exception:
+        return UMLGenerator().generate_svg(create_test_diagram())
+
+
 def generate_test_uml():
-    # Create test diagram
-    diagram = create_test_diagram()
-    
-    # Generate SVG
-    generator = UMLGenerator()
-    
     try:
-        svg_content = generator.generate_svg(diagram)
+        svg_content = render_test_svg()
         st.subheader("Test Diagram")
         st.markdown(f'<div style="overflow: auto;">{svg_content}</div>', unsafe_allow_html=True)
         st.success("Test diagram generated successfully!")
@@ -1,9 +1,96 @@
 import graphviz
+from graphviz import quoting
 import base64
+import hashlib
 import io
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 
-from utils.data_models import UMLDiagram, ClassDefinition, Relationship
+from utils.data_models import UMLDiagram, ClassDefinition, Relationship, Attribute, Method
+
+# Class label pieces
+SECTION_SEPARATOR = "-" * 15
+INTERFACE_PREFIX = "<<interface>>\n"
+ABSTRACT_PREFIX = "<<abstract>>\n"
+
+# Edge attributes for each relationship type, in the order they are written to the graph
+RELATIONSHIP_STYLES = {
+    "inheritance": {'dir': 'back', 'arrowtail': 'empty', 'style': 'solid'},
+    "implementation": {'dir': 'back', 'arrowtail': 'empty', 'style': 'dashed'},
+    "association": {'dir': 'none', 'style': 'solid'},
+    "dependency": {'dir': 'forward', 'arrowhead': 'vee', 'style': 'dashed'},
+    "aggregation": {'dir': 'back', 'arrowtail': 'odiamond', 'style': 'solid'},
+    "composition": {'dir': 'back', 'arrowtail': 'diamond', 'style': 'solid'},
+}
+
+
+def _escape_dot(identifier: str) -> str:
+    """Quote a string as a DOT identifier, as graphviz.Digraph does"""
+    return quoting.quote(identifier)
+
+
+# Edge endpoints repeat the same class names, so their quoted forms are kept
+_escape_dot_edge = lru_cache(maxsize=4096)(quoting.quote_edge)
+
+
+def _dot_attributes(attrs: Dict[str, str]) -> str:
+    """Format attributes for a DOT statement, sorted by name as graphviz.Digraph does"""
+    return quoting.a_list(kwargs=attrs)
+
+
+# The formatted edge attributes (after the label) for each relationship type
+EDGE_ATTRIBUTES = {
+    rel_type: _dot_attributes({'fontname': 'Arial', **style})
+    for rel_type, style in RELATIONSHIP_STYLES.items()
+}
+DEFAULT_EDGE_ATTRIBUTES = _dot_attributes({'fontname': 'Arial'})
+# Most edges have neither a label nor a multiplicity
+EMPTY_LABEL = _escape_dot('')
+
+# Rendered output keyed by (format, digest of the DOT source), least recently used first.
+# The DOT source fully determines Graphviz's output, so any diagram, filter or edit that
+# produces the same graph reuses the render instead of starting dot again.
+# Guarded by a lock because Streamlit serves each session from its own thread.
+RENDER_CACHE_SIZE = 32
+_rendered = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def pipe_cached(dot: graphviz.Digraph, format: Optional[str] = None) -> bytes:
+    """
+    Render a graph with Graphviz, reusing the output of an identical graph
+    
+    Args:
+        dot: The graph; it isn't modified, so it can be shared between renders
+        format: Output format, defaults to the graph's own format
+    """
+    format = format or dot.format
+    key = (format, hashlib.blake2b(dot.source.encode(), digest_size=16).hexdigest())
+    
+    with _rendered_lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key]
+    
+    output = dot.pipe(format=format)
+    
+    with _rendered_lock:
+        _rendered[key] = output
+        # Drop the least recently used renders beyond the cache size
+        while len(_rendered) > RENDER_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    
+    return output
+
+
+# Node statements keyed by the class's JSON, least recently used first. Filtering by
+# package or editing a few classes builds a new graph, but most classes come out the same,
+# and one serialization is cheaper than formatting every attribute and method again.
+NODE_CACHE_SIZE = 4096
+_class_nodes = OrderedDict()
+_class_nodes_lock = threading.Lock()
 
 
 class UMLGenerator:
@@ -17,33 +104,92 @@ class UMLGenerator:
         """Format class name for display - no escaping needed"""
         return name
     
-    def _format_attribute(self, attr: Dict[str, Any]) -> str:
+    def _format_attribute(self, attr: Attribute) -> str:
         """Format a single attribute for display"""
-        visibility = attr.get('visibility', '+')
-        static = "[static] " if attr.get('is_static', False) else ""
-        name = attr.get('name', '')
-        type_str = f": {attr.get('type', '')}" if attr.get('type') else ""
+        visibility = attr.visibility
+        static = "[static] " if attr.is_static else ""
+        name = attr.name
+        type_str = f": {attr.type}" if attr.type else ""
         return f"{visibility} {static}{name}{type_str}"
     
-    def _format_method(self, method: Dict[str, Any]) -> str:
+    def _format_method(self, method: Method) -> str:
         """Format a single method for display"""
-        visibility = method.get('visibility', '+')
-        static = "[static] " if method.get('is_static', False) else ""
-        abstract = "[abstract] " if method.get('is_abstract', False) else ""
-        name = method.get('name', '')
+        visibility = method.visibility
+        static = "[static] " if method.is_static else ""
+        abstract = "[abstract] " if method.is_abstract else ""
+        name = method.name
         
         # Format parameters
         params = []
-        for param in method.get('parameters', []):
+        for param in method.parameters:
             param_name = param.get('name', '')
             param_type = f": {param.get('type', '')}" if param.get('type') else ""
             params.append(f"{param_name}{param_type}")
         
         param_str = ", ".join(params)
-        return_type = f": {method.get('return_type', '')}" if method.get('return_type') else ""
+        return_type = f": {method.return_type}" if method.return_type else ""
         
         return f"{visibility} {static}{abstract}{name}({param_str}){return_type}"
     
+    def _class_label(self, class_def: ClassDefinition) -> str:
+        """Build the display label for a class: name, attributes and methods"""
+        name = class_def.name
+        label_parts = []
+        
+        # Class name section with stereotypes
+        display_name = name
+        if class_def.is_interface:
+            display_name = INTERFACE_PREFIX + name
+        elif class_def.is_abstract:
+            display_name = ABSTRACT_PREFIX + name
+        
+        label_parts.append(display_name)
+        
+        # Add package info if available
+        if class_def.package:
+            label_parts.append(f"({class_def.package})")
+        
+        # Line separator
+        label_parts.append(SECTION_SEPARATOR)
+        
+        # Attributes section
+        if class_def.attributes:
+            for attr in class_def.attributes:
+                attr_text = self._format_attribute(attr)
+                label_parts.append(attr_text)
+        
+        # Line separator
+        label_parts.append(SECTION_SEPARATOR)
+        
+        # Methods section
+        if class_def.methods:
+            for method in class_def.methods:
+                method_text = self._format_method(method)
+                label_parts.append(method_text)
+        
+        # Join all parts with newlines
+        return "\n".join(label_parts)
+    
+    def _node_statement(self, class_def: ClassDefinition) -> str:
+        """The DOT node statement for a class, reused while the class is unchanged"""
+        key = class_def.model_dump_json()
+        
+        with _class_nodes_lock:
+            statement = _class_nodes.get(key)
+            if statement is not None:
+                _class_nodes.move_to_end(key)
+                return statement
+        
+        statement = f"\t{_escape_dot(class_def.name)} [label={_escape_dot(self._class_label(class_def))}]\n"
+        
+        with _class_nodes_lock:
+            _class_nodes[key] = statement
+            # Drop the least recently used statements beyond the cache size
+            while len(_class_nodes) > NODE_CACHE_SIZE:
+                _class_nodes.popitem(last=False)
+        
+        return statement
+    
     def generate(self, uml_diagram: UMLDiagram, selected_package: Optional[str] = None) -> graphviz.Digraph:
         """Generate a Graphviz diagram using simple non-record labels
         
@@ -63,49 +209,15 @@ class UMLGenerator:
                               if cls.package == selected_package]
         
         # Get all class names that will be displayed
-        displayed_class_names = [cls.name for cls in classes_to_show]
+        displayed_class_names = {cls.name for cls in classes_to_show}
+        
+        # Node and edge statements are written straight into the graph's body; going
+        # through dot.node/dot.edge re-quotes and re-sorts the same attributes per call
+        body = dot.body
         
         # Create nodes for classes
         for class_def in classes_to_show:
-            name = class_def.name
-            label_parts = []
-            
-            # Class name section with stereotypes
-            display_name = name
-            if class_def.is_interface:
-                display_name = f"<<interface>>\n{name}"
-            elif class_def.is_abstract:
-                display_name = f"<<abstract>>\n{name}"
-            
-            label_parts.append(display_name)
-            
-            # Add package info if available
-            if class_def.package:
-                label_parts.append(f"({class_def.package})")
-            
-            # Line separator
-            label_parts.append("-" * 15)
-            
-            # Attributes section
-            if class_def.attributes:
-                for attr in class_def.attributes:
-                    attr_text = self._format_attribute(attr.model_dump())
-                    label_parts.append(attr_text)
-            
-            # Line separator
-            label_parts.append("-" * 15)
-            
-            # Methods section
-            if class_def.methods:
-                for method in class_def.methods:
-                    method_text = self._format_method(method.model_dump())
-                    label_parts.append(method_text)
-            
-            # Join all parts with newlines
-            label = "\n".join(label_parts)
-            
-            # Add node to graph
-            dot.node(name, label=label)
+            body.append(self._node_statement(class_def))
         
         # Create edges for relationships, filtering those involving displayed classes
         for rel in uml_diagram.relationships:
@@ -117,49 +229,29 @@ class UMLGenerator:
                 if source not in displayed_class_names or target not in displayed_class_names:
                     continue
             
-            edge_attrs = {
-                'label': rel.label or '',
-                'fontname': 'Arial'
-            }
-            
-            # Set style based on relationship type
-            if rel.type == "inheritance":
-                edge_attrs['dir'] = 'back'
-                edge_attrs['arrowtail'] = 'empty'
-                edge_attrs['style'] = 'solid'
-            elif rel.type == "implementation":
-                edge_attrs['dir'] = 'back'
-                edge_attrs['arrowtail'] = 'empty'
-                edge_attrs['style'] = 'dashed'
-            elif rel.type == "association":
-                edge_attrs['dir'] = 'none'
-                edge_attrs['style'] = 'solid'
-            elif rel.type == "dependency":
-                edge_attrs['dir'] = 'forward'
-                edge_attrs['arrowhead'] = 'vee'
-                edge_attrs['style'] = 'dashed'
-            elif rel.type == "aggregation":
-                edge_attrs['dir'] = 'back'
-                edge_attrs['arrowtail'] = 'odiamond'
-                edge_attrs['style'] = 'solid'
-            elif rel.type == "composition":
-                edge_attrs['dir'] = 'back'
-                edge_attrs['arrowtail'] = 'diamond'
-                edge_attrs['style'] = 'solid'
+            label = rel.label
             
             # Add multiplicity if specified
             if rel.multiplicity:
-                edge_attrs['label'] = rel.multiplicity if not rel.label else f"{rel.label}\n{rel.multiplicity}"
+                label = f"{label}\n{rel.multiplicity}" if label else rel.multiplicity
+            
+            # Set style based on relationship type
+            edge_attrs = EDGE_ATTRIBUTES.get(rel.type, DEFAULT_EDGE_ATTRIBUTES)
             
-            dot.edge(source, target, **edge_attrs)
+            body.append(
+                f"\t{_escape_dot_edge(source)} -> {_escape_dot_edge(target)} "
+                f"[label={_escape_dot(label) if label else EMPTY_LABEL} {edge_attrs}]\n"
+            )
         
         return dot
     
-    def generate_svg(self, uml_diagram: UMLDiagram, selected_package: Optional[str] = None) -> str:
-        """Generate SVG from the UML diagram"""
+    def generate_svg(self, uml_diagram: UMLDiagram, selected_package: Optional[str] = None,
+                     dot: Optional[graphviz.Digraph] = None) -> str:
+        """Generate SVG from the UML diagram, or from the graph already generated for it"""
         try:
-            dot = self.generate(uml_diagram, selected_package)
-            return dot.pipe().decode('utf-8')
+            if dot is None:
+                dot = self.generate(uml_diagram, selected_package)
+            return pipe_cached(dot).decode('utf-8')
         except Exception as e:
             # Return an error message as SVG
             error_dot = graphviz.Digraph(format='svg')
@@ -171,7 +263,7 @@ class UMLGenerator:
         """Generate base64 encoded image for embedding in HTML"""
         try:
             dot = self.generate(uml_diagram, selected_package)
-            svg_bytes = dot.pipe()
+            svg_bytes = pipe_cached(dot)
             return base64.b64encode(svg_bytes).decode('utf-8')
         except Exception as e:
             # Return an error message image
@@ -181,12 +273,13 @@ class UMLGenerator:
             svg_bytes = error_dot.pipe()
             return base64.b64encode(svg_bytes).decode('utf-8')
     
-    def generate_png_bytes(self, uml_diagram: UMLDiagram, selected_package: Optional[str] = None) -> bytes:
-        """Generate PNG bytes for download"""
+    def generate_png_bytes(self, uml_diagram: UMLDiagram, selected_package: Optional[str] = None,
+                           dot: Optional[graphviz.Digraph] = None) -> bytes:
+        """Generate PNG bytes for download, or from the graph already generated for the diagram"""
         try:
-            dot = self.generate(uml_diagram, selected_package)
-            dot.format = 'png'
-            return dot.pipe()
+            if dot is None:
+                dot = self.generate(uml_diagram, selected_package)
+            return pipe_cached(dot, 'png')
         except Exception as e:
             # Return an error message image
             error_dot = graphviz.Digraph(format='png')
@@ -204,6 +297,8 @@ class UMLGenerator:
         # Track packages and their classes
         packages = {}
         default_package = "Default"
+        # Package of each class name; a later class with the same name takes precedence
+        class_packages = {}
         
         # Group classes by package
         for class_def in uml_diagram.classes:
@@ -211,14 +306,20 @@ class UMLGenerator:
             if package_name not in packages:
                 packages[package_name] = []
             packages[package_name].append(class_def.name)
+            class_packages[class_def.name] = package_name
             
         # Create package nodes
         for package_name, class_list in packages.items():
             # Create a label with the package name and class list
             class_text = "\\n".join(class_list)
             label = f"{package_name}\\n\\n{class_text}"
-            dot.node(package_name, label=label)
+            dot.body.append(f"\t{_escape_dot(package_name)} [label={_escape_dot(label)}]\n")
             
+        # When every class is in the default package, so is every relationship endpoint
+        # (unknown classes fall back to it too), and no edges can come out of the loop
+        if packages.keys() <= {default_package}:
+            return dot
+        
         # Create edges between packages based on relationships
         package_dependencies = set()  # Track (source_package, target_package) pairs
         
@@ -227,30 +328,25 @@ class UMLGenerator:
             target_class = rel.target
             
             # Find the packages for source and target classes
-            source_package = default_package
-            target_package = default_package
+            source_package = class_packages.get(source_class, default_package)
+            target_package = class_packages.get(target_class, default_package)
             
-            for class_def in uml_diagram.classes:
-                if class_def.name == source_class:
-                    source_package = class_def.package if class_def.package else default_package
-                if class_def.name == target_class:
-                    target_package = class_def.package if class_def.package else default_package
-                    
             # Only add edges between different packages
             if source_package != target_package:
                 package_dependencies.add((source_package, target_package))
                 
         # Add the edges to the graph
         for source_package, target_package in package_dependencies:
-            dot.edge(source_package, target_package, style='dashed')
+            dot.body.append(f"\t{_escape_dot_edge(source_package)} -> {_escape_dot_edge(target_package)} [style=dashed]\n")
             
         return dot
         
-    def generate_package_svg(self, uml_diagram: UMLDiagram) -> str:
-        """Generate SVG for package diagram"""
+    def generate_package_svg(self, uml_diagram: UMLDiagram, dot: Optional[graphviz.Digraph] = None) -> str:
+        """Generate SVG for package diagram, or from the graph already generated for it"""
         try:
-            dot = self.generate_package_diagram(uml_diagram)
-            return dot.pipe().decode('utf-8')
+            if dot is None:
+                dot = self.generate_package_diagram(uml_diagram)
+            return pipe_cached(dot).decode('utf-8')
         except Exception as e:
             # Return an error message as SVG
             error_dot = graphviz.Digraph(format='svg')
@@ -259,12 +355,12 @@ class UMLGenerator:
                          shape='box', style='filled', fillcolor='#ffcccc')
             return error_dot.pipe().decode('utf-8')
             
-    def generate_package_png_bytes(self, uml_diagram: UMLDiagram) -> bytes:
-        """Generate PNG bytes for package diagram download"""
+    def generate_package_png_bytes(self, uml_diagram: UMLDiagram, dot: Optional[graphviz.Digraph] = None) -> bytes:
+        """Generate PNG bytes for package diagram download, or from the graph already generated for it"""
         try:
-            dot = self.generate_package_diagram(uml_diagram)
-            dot.format = 'png'
-            return dot.pipe()
+            if dot is None:
+                dot = self.generate_package_diagram(uml_diagram)
+            return pipe_cached(dot, 'png')
         except Exception as e:
             # Return an error message image
             error_dot = graphviz.Digraph(format='png')